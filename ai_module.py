@@ -4,9 +4,14 @@ import io
 import pyttsx3
 from vosk import Model, KaldiRecognizer
 import pyaudio
+from transcription import Transcription
+from audio_normalize import AudioNormalizer, needs_normalization, DEFAULT_RATE
 
 class LocalAI:
-    def __init__(self, vosk_model_path="model"):
+    # Débit d'entraînement des modèles Vosk (small-fr, etc.)
+    MODEL_RATE = DEFAULT_RATE
+    
+    def __init__(self, vosk_model_path="model", enable_tts=True):
         """
         Initialiser l'IA locale
         
@@ -14,6 +19,7 @@ class LocalAI:
             vosk_model_path: Chemin vers le modèle Vosk
                              Télécharger depuis: https://alphacephei.com/vosk/models
                              Recommandé: vosk-model-small-fr-0.22 pour français
+            enable_tts: Initialiser le moteur TTS (inutile en transcription seule)
         """
         print("🤖 Initialisation de l'IA locale...")
         
@@ -27,6 +33,25 @@ class LocalAI:
             self.vosk_model = None
         
         # Text-to-Speech (pyttsx3)
+        self.tts_engine = None
+        if enable_tts:
+            self.init_tts()
+        
+        # Base de connaissances simple pour l'assistant
+        self.responses = {
+            "bonjour": "Bonjour ! Comment puis-je vous aider ?",
+            "salut": "Salut ! Je suis là pour discuter !",
+            "comment ça va": "Je vais bien, merci ! Et vous ?",
+            "au revoir": "Au revoir ! À bientôt !",
+            "merci": "De rien, avec plaisir !",
+            "aide": "Je peux transcrire vos messages vocaux et répondre à vos questions !",
+            "qui es-tu": "Je suis un assistant IA local intégré au chat vocal !",
+            "heure": None,  # Sera géré dynamiquement
+            "date": None,   # Sera géré dynamiquement
+        }
+    
+    def init_tts(self):
+        """Initialiser le moteur de synthèse vocale"""
         try:
             self.tts_engine = pyttsx3.init()
             
@@ -45,19 +70,6 @@ class LocalAI:
         except Exception as e:
             print(f"❌ Erreur initialisation TTS: {e}")
             self.tts_engine = None
-        
-        # Base de connaissances simple pour l'assistant
-        self.responses = {
-            "bonjour": "Bonjour ! Comment puis-je vous aider ?",
-            "salut": "Salut ! Je suis là pour discuter !",
-            "comment ça va": "Je vais bien, merci ! Et vous ?",
-            "au revoir": "Au revoir ! À bientôt !",
-            "merci": "De rien, avec plaisir !",
-            "aide": "Je peux transcrire vos messages vocaux et répondre à vos questions !",
-            "qui es-tu": "Je suis un assistant IA local intégré au chat vocal !",
-            "heure": None,  # Sera géré dynamiquement
-            "date": None,   # Sera géré dynamiquement
-        }
     
     def speech_to_text_from_wav(self, audio_data):
         """
@@ -69,53 +81,85 @@ class LocalAI:
         Returns:
             str: Texte transcrit ou None si erreur
         """
+        transcription = self.speech_to_text_detailed(audio_data)
+        return transcription.text if transcription else None
+    
+    def speech_to_text_detailed(self, audio_data):
+        """
+        Convertir audio WAV en transcription structurée (mots horodatés)
+        
+        Args:
+            audio_data: bytes - données audio au format WAV
+            
+        Returns:
+            Transcription: Mots, timings et confiances, ou None si erreur/aucun texte
+        """
         if not self.vosk_model:
             print("❌ Modèle Vosk non chargé")
             return None
         
         try:
-            # Lire le WAV depuis les bytes
-            audio_buffer = io.BytesIO(audio_data)
-            with wave.open(audio_buffer, 'rb') as wf:
-                # Vérifier le format
-                if wf.getnchannels() != 1:
-                    print("⚠️  Audio doit être mono")
-                    return None
-                
-                # Créer le recognizer
-                recognizer = KaldiRecognizer(self.vosk_model, wf.getframerate())
-                recognizer.SetWords(True)
-                
-                # Traiter l'audio
-                text_parts = []
-                while True:
-                    data = wf.readframes(4000)
-                    if len(data) == 0:
-                        break
-                    
-                    if recognizer.AcceptWaveform(data):
-                        result = json.loads(recognizer.Result())
-                        if 'text' in result and result['text']:
-                            text_parts.append(result['text'])
-                
-                # Récupérer le dernier morceau
-                final_result = json.loads(recognizer.FinalResult())
-                if 'text' in final_result and final_result['text']:
-                    text_parts.append(final_result['text'])
-                
-                # Combiner tous les morceaux
-                full_text = ' '.join(text_parts).strip()
-                
-                if full_text:
-                    print(f"📝 Transcription: \"{full_text}\"")
-                    return full_text
-                else:
-                    print("⚠️  Aucun texte détecté")
-                    return None
-                    
+            transcription = self.decode_wav(audio_data)
         except Exception as e:
             print(f"❌ Erreur transcription: {e}")
             return None
+        
+        if transcription:
+            print(f"📝 Transcription: \"{transcription.text}\"")
+            return transcription
+        else:
+            print("⚠️  Aucun texte détecté")
+            return None
+    
+    def decode_wav(self, wav_source):
+        """
+        Décoder un WAV avec Vosk en conservant les timings des mots
+        
+        Args:
+            wav_source: bytes ou objet fichier (ex: mmap) au format WAV
+                        (stéréo et autres débits convertis à la volée)
+            
+        Returns:
+            Transcription: Résultat structuré (texte, timings et confiance des mots)
+        """
+        if not self.vosk_model:
+            raise RuntimeError("Modèle Vosk non chargé")
+        
+        if isinstance(wav_source, (bytes, bytearray)):
+            wav_source = io.BytesIO(wav_source)
+        
+        with wave.open(wav_source, 'rb') as wf:
+            # Convertir en mono int16 au débit du modèle si nécessaire
+            normalizer = None
+            if needs_normalization(wf, self.MODEL_RATE):
+                normalizer = AudioNormalizer(wf.getframerate(), wf.getnchannels(),
+                                             wf.getsampwidth(), self.MODEL_RATE)
+            
+            # Créer le recognizer
+            recognizer = KaldiRecognizer(self.vosk_model, self.MODEL_RATE)
+            recognizer.SetWords(True)
+            
+            transcription = Transcription(wf.getnframes() / float(wf.getframerate()))
+            
+            # Traiter l'audio (les mots viennent du JSON déjà décodé, sans coût supplémentaire)
+            while True:
+                data = wf.readframes(4000)
+                if len(data) == 0:
+                    break
+                
+                if normalizer:
+                    data = normalizer.process(data)
+                
+                if recognizer.AcceptWaveform(data):
+                    transcription.add_vosk_result(json.loads(recognizer.Result()))
+            
+            if normalizer:
+                recognizer.AcceptWaveform(normalizer.flush())
+            
+            # Récupérer le dernier morceau
+            transcription.add_vosk_result(json.loads(recognizer.FinalResult()))
+        
+        return transcription
     
     def speech_to_text_live(self, duration=5):
         """
@@ -211,6 +255,41 @@ class LocalAI:
             print(f"❌ Erreur TTS: {e}")
             return False
     
+    def text_to_speech_wav(self, text):
+        """
+        Synthétiser du texte en audio WAV en mémoire
+        
+        Args:
+            text: Texte à synthétiser
+            
+        Returns:
+            bytes: Audio WAV ou None si erreur
+        """
+        import os
+        import tempfile
+        
+        # Créer un fichier temporaire pour la synthèse
+        temp_file = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
+        temp_path = temp_file.name
+        temp_file.close()
+        
+        try:
+            if not self.text_to_speech(text, save_to_file=temp_path):
+                return None
+            
+            # Lire le fichier audio généré
+            with open(temp_path, 'rb') as f:
+                return f.read()
+                
+        except Exception as e:
+            print(f"❌ Erreur lecture audio réponse: {e}")
+            return None
+        finally:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    
     def get_ai_response(self, user_input):
         """
         Générer une réponse IA basique
@@ -255,21 +334,25 @@ class LocalAI:
             auto_respond: bool - Générer une réponse automatique
             
         Returns:
-            dict: {'transcription': str, 'response': str, 'response_audio': bytes}
+            dict: {'transcription': str, 'details': Transcription,
+                   'response': str, 'response_audio': bytes}
         """
         result = {
             'transcription': None,
+            'details': None,
             'response': None,
             'response_audio': None
         }
         
         # 1. Speech-to-Text
-        transcription = self.speech_to_text_from_wav(audio_data)
-        result['transcription'] = transcription
-        
-        if not transcription:
+        details = self.speech_to_text_detailed(audio_data)
+        if not details:
             return result
         
+        transcription = details.text
+        result['transcription'] = transcription
+        result['details'] = details
+        
         # 2. Générer réponse si demandé
         if auto_respond:
             response = self.get_ai_response(transcription)
@@ -277,22 +360,7 @@ class LocalAI:
             
             # 3. Text-to-Speech de la réponse
             if response:
-                # Créer un fichier temporaire pour la réponse
-                import tempfile
-                temp_file = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-                temp_path = temp_file.name
-                temp_file.close()
-                
-                if self.text_to_speech(response, save_to_file=temp_path):
-                    # Lire le fichier audio généré
-                    try:
-                        with open(temp_path, 'rb') as f:
-                            result['response_audio'] = f.read()
-                        
-                        import os
-                        os.remove(temp_path)
-                    except Exception as e:
-                        print(f"❌ Erreur lecture audio réponse: {e}")
+                result['response_audio'] = self.text_to_speech_wav(response)
         
         return result
 
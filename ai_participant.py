@@ -0,0 +1,166 @@
+import queue
+import threading
+import time
+from collections import deque
+
+AI_USERNAME = "🤖 Assistant"
+
+
+class AIParticipant:
+    def __init__(self, server, ai, max_queue=16, max_per_minute=6):
+        """
+        Assistant IA hébergé par le serveur comme utilisateur virtuel
+
+        Le travail IA (transcription, réponse, synthèse) tourne dans un
+        thread dédié: le relais audio ne fait qu'un put_nowait().
+
+        Args:
+            server: VocalChatServer hôte
+            ai: Instance de LocalAI
+            max_queue: Taille maximale de la file d'attente (au-delà: rejet)
+            max_per_minute: Nombre maximum de messages traités par salon et par minute
+        """
+        self.server = server
+        self.ai = ai
+        self.username = AI_USERNAME
+        self.max_per_minute = max_per_minute
+
+        self.rooms = set()  # Salons ayant activé l'assistant
+        self.rooms_lock = threading.Lock()
+        self.room_history = {}  # {salon: deque des instants de traitement}
+
+        self.jobs = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.rate_limited = 0
+
+        # Latences mesurées (secondes) de la boucle parole -> transcription -> réponse
+        self.latencies = {
+            'transcript': deque(maxlen=1000),
+            'reply': deque(maxlen=1000),
+        }
+
+        self.running = True
+        self.worker = threading.Thread(target=self.process_jobs)
+        self.worker.daemon = True
+        self.worker.start()
+
+    def set_room_enabled(self, room, enabled):
+        """Activer ou désactiver l'assistant dans un salon"""
+        with self.rooms_lock:
+            if enabled:
+                self.rooms.add(room)
+            else:
+                self.rooms.discard(room)
+                self.room_history.pop(room, None)
+
+    def is_enabled(self, room):
+        with self.rooms_lock:
+            return room in self.rooms
+
+    def submit(self, room, username, audio_data):
+        """
+        Soumettre un message audio relayé (non bloquant)
+
+        Returns:
+            bool: True si le message a été mis en file
+        """
+        now = time.monotonic()
+
+        with self.rooms_lock:
+            if room not in self.rooms:
+                return False
+
+            # Limitation par salon: fenêtre glissante d'une minute
+            history = self.room_history.setdefault(room, deque())
+            while history and now - history[0] > 60:
+                history.popleft()
+            if len(history) >= self.max_per_minute:
+                self.rate_limited += 1
+                print(f"⏳ Assistant: limite atteinte dans #{room}, message de {username} ignoré")
+                return False
+            history.append(now)
+
+        try:
+            self.jobs.put_nowait((room, username, audio_data, now))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"⚠️  Assistant saturé, message de {username} ignoré")
+            return False
+
+    def process_jobs(self):
+        """Boucle du thread IA"""
+        while self.running:
+            try:
+                job = self.jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            if job is None:
+                break
+
+            room, username, audio_data, received_at = job
+            try:
+                self.process_job(room, username, audio_data, received_at)
+            except Exception as e:
+                print(f"❌ Erreur assistant: {e}")
+
+    def process_job(self, room, username, audio_data, received_at):
+        """Transcrire, diffuser la transcription puis la réponse vocale"""
+        # 1. Transcription
+        transcription = self.ai.speech_to_text_from_wav(audio_data)
+        if not transcription:
+            return
+
+        transcript_latency = time.monotonic() - received_at
+        self.latencies['transcript'].append(transcript_latency)
+
+        self.server.search_index.add_document(transcription, username, kind='transcript', room=room)
+        self.server.broadcast_text(None, self.username, f"📝 {username}: {transcription}", room)
+
+        # 2. Réponse
+        response = self.ai.get_ai_response(transcription)
+        if not response or not self.is_enabled(room):
+            print(f"⏱️  Assistant: transcription en {transcript_latency * 1000:.0f} ms")
+            return
+
+        self.server.broadcast_text(None, self.username, response, room)
+
+        # 3. Synthèse vocale de la réponse
+        response_audio = self.ai.text_to_speech_wav(response)
+        if response_audio:
+            self.server.broadcast_audio(None, self.username, response_audio, room)
+            reply_latency = time.monotonic() - received_at
+            self.latencies['reply'].append(reply_latency)
+            print(f"⏱️  Assistant: transcription {transcript_latency * 1000:.0f} ms, "
+                  f"réponse audio {reply_latency * 1000:.0f} ms")
+
+    def latency_report(self):
+        """
+        Résumé des latences mesurées
+
+        Returns:
+            dict: {'transcript': {'count', 'p50_ms', 'p95_ms'}, 'reply': {...}}
+        """
+        report = {}
+        for stage, values in self.latencies.items():
+            values = sorted(values)
+            if not values:
+                report[stage] = {'count': 0, 'p50_ms': None, 'p95_ms': None}
+                continue
+            report[stage] = {
+                'count': len(values),
+                'p50_ms': round(values[len(values) // 2] * 1000, 1),
+                'p95_ms': round(values[max(0, int(len(values) * 0.95) - 1)] * 1000, 1),
+            }
+        report['dropped'] = self.dropped
+        report['rate_limited'] = self.rate_limited
+        return report
+
+    def stop(self):
+        """Arrêter le thread IA"""
+        self.running = False
+        try:
+            self.jobs.put_nowait(None)
+        except queue.Full:
+            pass
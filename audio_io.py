@@ -0,0 +1,201 @@
+import io
+import time
+import wave
+import threading
+
+try:
+    import pyaudio
+except ImportError:  # Mode headless (tests, benchmarks, serveurs sans carte son)
+    pyaudio = None
+
+# Format audio du chat: PCM 16 bits mono à 16 kHz
+RATE = 16000
+CHANNELS = 1
+SAMPLE_WIDTH = 2
+CHUNK = 1024
+
+# Débits acceptés pour un audio reçu (en dehors: taille de conversion non bornée)
+MIN_RATE = 8000
+MAX_RATE = 48000
+MAX_CHANNELS = 8
+
+
+def pcm_to_wav(pcm, rate=RATE, channels=CHANNELS, sampwidth=SAMPLE_WIDTH):
+    """Encapsuler du PCM brut dans un WAV (bytes)"""
+    audio_buffer = io.BytesIO()
+    with wave.open(audio_buffer, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(sampwidth)
+        wf.setframerate(rate)
+        wf.writeframes(pcm)
+    return audio_buffer.getvalue()
+
+
+def check_wav(audio_data):
+    """
+    Valider l'en-tête d'un WAV non fiable avant toute conversion
+
+    Args:
+        audio_data: bytes - données WAV
+
+    Returns:
+        tuple: (débit, canaux, taille d'échantillon)
+
+    Raises:
+        ValueError: WAV illisible ou paramètres hors bornes
+    """
+    try:
+        with wave.open(io.BytesIO(audio_data), 'rb') as wf:
+            rate, channels, sampwidth = wf.getframerate(), wf.getnchannels(), wf.getsampwidth()
+    except (wave.Error, EOFError) as e:
+        raise ValueError(f"WAV invalide: {e}")
+
+    if not MIN_RATE <= rate <= MAX_RATE:
+        raise ValueError(f"Débit hors bornes: {rate} Hz")
+    if not 1 <= channels <= MAX_CHANNELS:
+        raise ValueError(f"Nombre de canaux invalide: {channels}")
+    if sampwidth not in (1, 2, 3, 4):
+        raise ValueError(f"Taille d'échantillon invalide: {sampwidth}")
+    return rate, channels, sampwidth
+
+
+class PyAudioSource:
+    def __init__(self, audio, rate=RATE, chunk=CHUNK):
+        """
+        Source micro PyAudio
+
+        Args:
+            audio: Instance pyaudio.PyAudio partagée
+            rate: Débit d'enregistrement (Hz)
+            chunk: Trames par lecture
+        """
+        self.audio = audio
+        self.rate = rate
+        self.chunk = chunk
+
+    def record(self, seconds):
+        """
+        Enregistrer depuis le micro
+
+        Returns:
+            bytes: Audio WAV
+        """
+        stream = self.audio.open(
+            format=pyaudio.paInt16,
+            channels=CHANNELS,
+            rate=self.rate,
+            input=True,
+            frames_per_buffer=self.chunk
+        )
+
+        frames = []
+        try:
+            for _ in range(0, int(self.rate / self.chunk * seconds)):
+                frames.append(stream.read(self.chunk, exception_on_overflow=False))
+        finally:
+            stream.stop_stream()
+            stream.close()
+
+        return pcm_to_wav(b''.join(frames), self.rate)
+
+    def close(self):
+        pass
+
+
+class PyAudioSink:
+    def __init__(self, audio, rate=RATE, chunk=CHUNK):
+        """
+        Sortie haut-parleur PyAudio avec un flux unique et persistant
+
+        Le flux est ouvert une seule fois au format du chat; les clips
+        d'un autre format sont convertis au lieu de rouvrir un flux.
+
+        Args:
+            audio: Instance pyaudio.PyAudio partagée
+            rate: Débit du flux de sortie (Hz)
+            chunk: Trames par écriture
+        """
+        self.audio = audio
+        self.rate = rate
+        self.chunk = chunk
+        self.stream = None
+
+    def play(self, audio_data):
+        """Jouer un clip WAV (bloquant jusqu'à la fin de l'écriture)"""
+        with wave.open(io.BytesIO(audio_data), 'rb') as wf:
+            if wf.getnchannels() != CHANNELS or wf.getsampwidth() != SAMPLE_WIDTH \
+                    or wf.getframerate() != self.rate:
+                from audio_normalize import normalize_wav
+                audio_data = normalize_wav(audio_data, self.rate)
+                return self.play(audio_data)
+            pcm = wf.readframes(wf.getnframes())
+
+        if self.stream is None:
+            self.stream = self.audio.open(
+                format=pyaudio.paInt16,
+                channels=CHANNELS,
+                rate=self.rate,
+                output=True,
+                frames_per_buffer=self.chunk
+            )
+
+        step = self.chunk * CHANNELS * SAMPLE_WIDTH
+        for i in range(0, len(pcm), step):
+            self.stream.write(pcm[i:i + step])
+
+    def close(self):
+        if self.stream:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception:
+                pass
+            self.stream = None
+
+
+class MemorySource:
+    def __init__(self, clips=None, realtime=False):
+        """
+        Source injectable pour le mode headless
+
+        Args:
+            clips: Liste de clips WAV renvoyés dans l'ordre (silence ensuite)
+            realtime: Simuler la durée d'enregistrement (time.sleep)
+        """
+        self.clips = list(clips or [])
+        self.realtime = realtime
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        if self.realtime:
+            time.sleep(seconds)
+        with self.lock:
+            if self.clips:
+                return self.clips.pop(0)
+        return pcm_to_wav(b'\x00\x00' * int(RATE * seconds))
+
+    def close(self):
+        pass
+
+
+class MemorySink:
+    def __init__(self, realtime=False):
+        """
+        Sortie injectable: conserve les clips joués et leur instant de lecture
+
+        Args:
+            realtime: Simuler la durée de lecture (time.sleep)
+        """
+        self.realtime = realtime
+        self.played = []  # [(instant, audio WAV), ...]
+        self.lock = threading.Lock()
+
+    def play(self, audio_data):
+        if self.realtime:
+            with wave.open(io.BytesIO(audio_data), 'rb') as wf:
+                time.sleep(wf.getnframes() / float(wf.getframerate()))
+        with self.lock:
+            self.played.append((time.perf_counter(), audio_data))
+
+    def close(self):
+        pass
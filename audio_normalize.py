@@ -0,0 +1,280 @@
+import io
+import math
+import time
+import wave
+
+import numpy as np
+
+from audio_io import MIN_RATE, MAX_RATE, check_wav
+
+# Débit attendu par les modèles Vosk et utilisé par les clients
+DEFAULT_RATE = 16000
+
+# Trames de sortie par trame d'entrée au plus (débits bornés à [MIN_RATE, MAX_RATE])
+MAX_RATE_RATIO = MAX_RATE // MIN_RATE
+
+
+def pcm_to_float(data, sampwidth, channels):
+    """
+    Convertir du PCM entrelacé en float32 dans [-1, 1]
+
+    Args:
+        data: bytes - trames PCM complètes
+        sampwidth: Taille d'un échantillon (1, 2, 3 ou 4 octets)
+        channels: Nombre de canaux
+
+    Returns:
+        np.ndarray: Tableau (trames, canaux) en float32
+    """
+    if sampwidth == 1:
+        # WAV 8 bits: non signé, centré sur 128
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sampwidth == 2:
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+    elif sampwidth == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        value = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        value = np.where(value & 0x800000, value - 0x1000000, value)
+        samples = value.astype(np.float32) / 8388608.0
+    elif sampwidth == 4:
+        samples = (np.frombuffer(data, dtype='<i4') / 2147483648.0).astype(np.float32)
+    else:
+        raise ValueError(f"Taille d'échantillon non supportée: {sampwidth}")
+
+    return samples.reshape(-1, channels)
+
+
+def downmix(samples):
+    """Réduire (trames, canaux) en mono par moyenne des canaux"""
+    if samples.shape[1] == 1:
+        return samples[:, 0]
+    return samples.mean(axis=1, dtype=np.float32)
+
+
+def float_to_int16(samples):
+    """Convertir du float32 [-1, 1] en PCM int16 (bytes) avec saturation"""
+    return np.clip(np.rint(samples * 32767.0), -32768, 32767).astype('<i2').tobytes()
+
+
+class Resampler:
+    def __init__(self, in_rate, out_rate, zero_crossings=16, rolloff=0.94, beta=8.6):
+        """
+        Rééchantillonneur polyphasé à sinc fenêtré (Kaiser), utilisable en flux
+
+        Args:
+            in_rate: Débit d'entrée (Hz)
+            out_rate: Débit de sortie (Hz)
+            zero_crossings: Passages à zéro du sinc de chaque côté (qualité)
+            rolloff: Fréquence de coupure relative à la Nyquist la plus basse
+            beta: Paramètre de la fenêtre de Kaiser
+
+        Raises:
+            ValueError: Débit hors de [MIN_RATE, MAX_RATE] (le débit source vient
+                        d'un en-tête WAV non fiable et fixe la taille de sortie)
+        """
+        for rate in (in_rate, out_rate):
+            if type(rate) is not int or not MIN_RATE <= rate <= MAX_RATE:
+                raise ValueError(f"Débit non supporté: {rate} Hz")
+        g = math.gcd(in_rate, out_rate)
+        self.up = out_rate // g
+        self.down = in_rate // g
+        self.passthrough = self.up == self.down
+
+        # Coupure relative à la Nyquist d'entrée (plus basse en sous-échantillonnage)
+        cutoff = min(1.0, self.up / self.down) * rolloff
+        half_width = zero_crossings / cutoff
+        self.taps = 2 * int(math.ceil(half_width))
+        self.center = self.taps // 2 - 1
+
+        # Banque de filtres: une ligne par phase fractionnaire
+        offsets = np.arange(self.taps) - self.center
+        t = np.arange(self.up)[:, None] / self.up - offsets[None, :]
+        window = np.i0(beta * np.sqrt(np.clip(1.0 - (t / half_width) ** 2, 0.0, None))) / np.i0(beta)
+        window[np.abs(t) >= half_width] = 0.0
+        self.bank = (cutoff * np.sinc(cutoff * t) * window).astype(np.float32)
+
+        self.reset()
+
+    def reset(self):
+        """Réinitialiser l'état du flux"""
+        # Historique nul avant le premier échantillon
+        self.buffer = np.zeros(self.center, dtype=np.float32)
+        self.buffer_start = -self.center  # Indice absolu de buffer[0]
+        self.next_out = 0
+        self.total_in = 0
+
+    def process(self, samples, max_block=16384):
+        """
+        Rééchantillonner un bloc mono (float32) du flux
+
+        Returns:
+            np.ndarray: Échantillons de sortie disponibles
+        """
+        if self.passthrough:
+            return samples
+
+        self.total_in += len(samples)
+        self.buffer = np.concatenate((self.buffer, samples.astype(np.float32, copy=False)))
+        return self._drain(self.buffer_start + len(self.buffer) - 1 - (self.taps - 1 - self.center),
+                           max_block)
+
+    def flush(self):
+        """Terminer le flux (complète avec des zéros) et renvoyer les derniers échantillons"""
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+
+        self.buffer = np.concatenate((self.buffer, np.zeros(self.taps, dtype=np.float32)))
+        last_out = -(-self.total_in * self.up // self.down) - 1
+        out = self._drain(self.buffer_start + len(self.buffer) - 1 - (self.taps - 1 - self.center),
+                          16384, last_out)
+        self.reset()
+        return out
+
+    def _drain(self, max_base, max_block, last_out=None):
+        # Plus grand n tel que floor(n * down / up) <= max_base
+        n_max = (max_base * self.up + self.up - 1) // self.down
+        if last_out is not None:
+            n_max = min(n_max, last_out)
+        if n_max < self.next_out:
+            return np.zeros(0, dtype=np.float32)
+
+        offsets = np.arange(self.taps) - self.center
+        outputs = []
+        for first in range(self.next_out, n_max + 1, max_block):
+            n = np.arange(first, min(first + max_block, n_max + 1), dtype=np.int64)
+            position = n * self.down
+            bases = position // self.up
+            phases = position % self.up
+            index = (bases - self.buffer_start)[:, None] + offsets[None, :]
+            outputs.append(np.einsum('ij,ij->i', self.buffer[index], self.bank[phases]))
+
+        self.next_out = n_max + 1
+
+        # Oublier les échantillons qui ne serviront plus
+        keep_from = (self.next_out * self.down) // self.up - self.center
+        drop = keep_from - self.buffer_start
+        if drop > 0:
+            self.buffer = self.buffer[drop:]
+            self.buffer_start = keep_from
+
+        return np.concatenate(outputs).astype(np.float32, copy=False)
+
+
+class AudioNormalizer:
+    def __init__(self, in_rate, channels, sampwidth, out_rate=DEFAULT_RATE):
+        """
+        Normalisation en flux: mixage mono, rééchantillonnage, PCM int16
+
+        Args:
+            in_rate: Débit source (Hz)
+            channels: Nombre de canaux source
+            sampwidth: Taille d'échantillon source (octets)
+            out_rate: Débit cible (Hz)
+        """
+        self.channels = channels
+        self.sampwidth = sampwidth
+        self.frame_size = channels * sampwidth
+        self.out_rate = out_rate
+        self.resampler = Resampler(in_rate, out_rate)
+        self.pending = b''  # Trame incomplète du chunk précédent
+
+    @property
+    def is_identity(self):
+        return self.channels == 1 and self.sampwidth == 2 and self.resampler.passthrough
+
+    def process(self, data):
+        """
+        Normaliser un chunk PCM (peut couper une trame en deux)
+
+        Returns:
+            bytes: PCM int16 mono au débit cible
+        """
+        if self.is_identity:
+            return data
+
+        data = self.pending + data
+        usable = len(data) - len(data) % self.frame_size
+        self.pending = data[usable:]
+        if not usable:
+            return b''
+
+        mono = downmix(pcm_to_float(data[:usable], self.sampwidth, self.channels))
+        return float_to_int16(self.resampler.process(mono))
+
+    def flush(self):
+        """Vider l'état interne en fin de flux"""
+        if self.is_identity:
+            return b''
+        self.pending = b''
+        return float_to_int16(self.resampler.flush())
+
+
+def needs_normalization(wf, target_rate=DEFAULT_RATE):
+    """Indiquer si un WAV ouvert doit être converti pour le débit cible"""
+    return wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != target_rate
+
+
+def normalize_wav(audio_data, target_rate=DEFAULT_RATE):
+    """
+    Convertir un WAV quelconque en WAV mono int16 au débit cible
+
+    Args:
+        audio_data: bytes - données WAV
+        target_rate: Débit cible (Hz)
+
+    Returns:
+        bytes: WAV normalisé (inchangé s'il est déjà au bon format)
+
+    Raises:
+        ValueError: En-tête invalide ou sortie disproportionnée par rapport à l'entrée
+    """
+    in_rate, channels, sampwidth = check_wav(audio_data)
+    with wave.open(io.BytesIO(audio_data), 'rb') as wf:
+        if not needs_normalization(wf, target_rate):
+            return audio_data
+
+        # Trames réellement présentes (l'en-tête peut en annoncer davantage)
+        frames = min(wf.getnframes(), len(audio_data) // (channels * sampwidth))
+        if frames * target_rate > MAX_RATE_RATIO * frames * in_rate:
+            raise ValueError(f"Conversion {in_rate} -> {target_rate} Hz disproportionnée")
+
+        normalizer = AudioNormalizer(in_rate, channels, sampwidth, target_rate)
+        pcm = normalizer.process(wf.readframes(frames)) + normalizer.flush()
+
+    out = io.BytesIO()
+    with wave.open(out, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(target_rate)
+        wf.writeframes(pcm)
+    return out.getvalue()
+
+
+# Fonction utilitaire pour mesurer la normalisation
+def benchmark_normalizer(seconds=60, chunk_frames=4096):
+    """Mesurer le débit (échantillons/s) de la normalisation en flux"""
+    print("🧪 BENCHMARK NORMALISATION AUDIO")
+    print("=" * 60)
+
+    for in_rate, channels in [(16000, 1), (44100, 2), (48000, 2), (8000, 1)]:
+        t = np.arange(in_rate * seconds) / in_rate
+        tone = 0.5 * np.sin(2 * np.pi * 440 * t)
+        pcm = float_to_int16(np.repeat(tone[:, None], channels, axis=1).ravel())
+
+        normalizer = AudioNormalizer(in_rate, channels, 2)
+        chunk_bytes = chunk_frames * channels * 2
+        start = time.perf_counter()
+        out_bytes = 0
+        for i in range(0, len(pcm), chunk_bytes):
+            out_bytes += len(normalizer.process(pcm[i:i + chunk_bytes]))
+        out_bytes += len(normalizer.flush())
+        elapsed = time.perf_counter() - start
+
+        in_samples = in_rate * seconds * channels
+        print(f"🎚️  {in_rate} Hz x{channels} -> {DEFAULT_RATE} Hz mono: "
+              f"{in_samples / elapsed / 1e6:.1f} M échantillons/s "
+              f"({seconds / elapsed:.0f}x temps réel, {out_bytes // 2} échantillons)")
+
+
+if __name__ == "__main__":
+    benchmark_normalizer()
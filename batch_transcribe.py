@@ -0,0 +1,166 @@
+import os
+import json
+import mmap
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Modèle partagé par toutes les tâches d'un même processus worker
+_worker_ai = None
+
+
+def _init_worker(model_path):
+    """Charger le modèle Vosk une seule fois par processus"""
+    global _worker_ai
+    from ai_module import LocalAI
+    _worker_ai = LocalAI(vosk_model_path=model_path, enable_tts=False)
+
+
+def transcribe_file(path):
+    """
+    Transcrire un fichier WAV (exécuté dans un worker)
+
+    Args:
+        path: Chemin du fichier WAV
+
+    Returns:
+        dict: Résultat JSONL (texte, mots horodatés, durée, temps de calcul)
+    """
+    start = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            # mmap: le WAV n'est pas copié en mémoire, le noyau pagine à la demande
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                transcription = _worker_ai.decode_wav(mapped)
+        result = transcription.to_dict()
+        return {
+            'path': path,
+            'text': result['text'],
+            'words': result['words'],
+            'duration': result['duration'],
+            'elapsed': round(time.perf_counter() - start, 3),
+            'worker': os.getpid(),
+        }
+    except Exception as e:
+        return {
+            'path': path,
+            'error': str(e),
+            'elapsed': round(time.perf_counter() - start, 3),
+            'worker': os.getpid(),
+        }
+
+
+def find_wav_files(inputs):
+    """Lister les fichiers WAV des dossiers/fichiers donnés (ordre stable)"""
+    paths = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            for root, dirs, files in os.walk(entry):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith('.wav'):
+                        paths.append(os.path.join(root, name))
+        elif entry.lower().endswith('.wav'):
+            paths.append(entry)
+        else:
+            print(f"⚠️  Ignoré (ni dossier ni .wav): {entry}")
+    return paths
+
+
+def load_checkpoint(output_path):
+    """
+    Lire les fichiers déjà transcrits avec succès
+
+    Le JSONL de sortie sert de point de reprise: une ligne écrite est
+    un fichier terminé. Une dernière ligne tronquée (arrêt brutal) est ignorée.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if 'error' not in entry:
+                done.add(entry['path'])
+    return done
+
+
+def run_batch(inputs, model_path="model", output_path="transcriptions.jsonl", workers=None):
+    """
+    Transcrire une archive de messages vocaux en parallèle
+
+    Args:
+        inputs: Liste de dossiers et/ou fichiers WAV
+        model_path: Chemin vers le modèle Vosk
+        output_path: Fichier JSONL de résultats (et de reprise)
+        workers: Nombre de processus (par défaut: nombre de cœurs)
+
+    Returns:
+        dict: Statistiques {'files', 'errors', 'audio_seconds', 'wall_seconds', 'rtf_per_worker'}
+    """
+    workers = workers or os.cpu_count() or 1
+
+    paths = find_wav_files(inputs)
+    done = load_checkpoint(output_path)
+    pending = [p for p in paths if p not in done]
+
+    print(f"📂 {len(paths)} fichiers trouvés, {len(done)} déjà transcrits, {len(pending)} à traiter")
+    print(f"⚙️  {workers} workers")
+
+    stats = {'files': 0, 'errors': 0, 'audio_seconds': 0.0, 'wall_seconds': 0.0, 'rtf_per_worker': {}}
+    per_worker = {}  # {pid: [temps de calcul, durée audio]}
+
+    start = time.perf_counter()
+    with open(output_path, 'a', encoding='utf-8') as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(model_path,)) as executor:
+        futures = [executor.submit(transcribe_file, path) for path in pending]
+
+        for i, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+            out.flush()
+
+            totals = per_worker.setdefault(result['worker'], [0.0, 0.0])
+            totals[0] += result['elapsed']
+
+            if 'error' in result:
+                stats['errors'] += 1
+                print(f"❌ [{i}/{len(pending)}] {result['path']}: {result['error']}")
+                continue
+
+            totals[1] += result['duration']
+            stats['files'] += 1
+            stats['audio_seconds'] += result['duration']
+            print(f"📝 [{i}/{len(pending)}] {result['path']}: \"{result['text']}\"")
+
+    stats['wall_seconds'] = time.perf_counter() - start
+
+    # Facteur temps réel par cœur: temps de calcul / durée audio (< 1 = plus rapide que le temps réel)
+    for pid, (elapsed, duration) in per_worker.items():
+        stats['rtf_per_worker'][pid] = round(elapsed / duration, 3) if duration else None
+
+    print("-" * 60)
+    print(f"✅ {stats['files']} transcrits, {stats['errors']} erreurs, "
+          f"{stats['audio_seconds']:.1f}s d'audio en {stats['wall_seconds']:.1f}s")
+    for pid, rtf in sorted(stats['rtf_per_worker'].items()):
+        print(f"  ⏱️  worker {pid}: RTF {rtf}")
+    if stats['wall_seconds'] > 0:
+        print(f"  🚀 Débit global: {stats['audio_seconds'] / stats['wall_seconds']:.1f}x temps réel")
+
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcription par lot d'archives WAV")
+    parser.add_argument('inputs', nargs='+', help="Dossiers ou fichiers WAV à transcrire")
+    parser.add_argument('-m', '--model', default='model', help="Chemin du modèle Vosk")
+    parser.add_argument('-o', '--output', default='transcriptions.jsonl', help="Fichier JSONL de sortie")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Nombre de processus")
+    args = parser.parse_args()
+
+    run_batch(args.inputs, model_path=args.model, output_path=args.output, workers=args.workers)
@@ -1,239 +1,392 @@
 import socket
 import threading
-import struct
-import pyaudio
-import wave
-import io
+import queue
 import time
+from collections import deque
 from datetime import datetime
+from audio_io import pyaudio, PyAudioSource, PyAudioSink, RATE
+import protocol
 
 class VocalChatClient:
-    def __init__(self, host='127.0.0.1', port=5555):
+    def __init__(self, host='127.0.0.1', port=5555, audio_source=None, audio_sink=None,
+                 max_pending_playback=32, ssl_context=None, server_hostname=None, use_udp=False):
+        """
+        Client de chat vocal organisé en pipeline
+        
+        Threads: réception (lecture des trames uniquement), lecture audio
+        (file + flux de sortie persistant), capture micro et envoi (file unique).
+        
+        Args:
+            host: Adresse du serveur
+            port: Port du serveur
+            audio_source: Source injectable (record(seconds) -> WAV), par défaut le micro
+            audio_sink: Sortie injectable (play(wav)), par défaut le haut-parleur
+            max_pending_playback: Clips en attente de lecture au-delà desquels on jette les plus anciens
+            ssl_context: Contexte TLS client (voir tls.client_context), None = TCP en clair
+            server_hostname: Nom vérifié dans le certificat (par défaut: host)
+            use_udp: Demander le plan média UDP pour l'audio (texte et contrôle restent en TCP).
+                     Non chiffré: ignoré avec TLS
+        """
         self.host = host
         self.port = port
         self.socket = None
         self.username = None
         self.running = False
         self.connected_users = []
+        self.room = 'general'
+        self.ai_enabled = False
+        
+        # TLS: la session est conservée pour reprendre sans poignée de main complète
+        self.ssl_context = ssl_context
+        self.server_hostname = server_hostname or host
+        self.tls_session = None
+        
+        # Plan média UDP (négocié dans le HELLO/WELCOME)
+        self.use_udp = use_udp
+        self.media = None
         
         # Configuration audio
-        self.CHUNK = 1024
-        self.FORMAT = pyaudio.paInt16
-        self.CHANNELS = 1
-        self.RATE = 16000
+        self.RATE = RATE
         self.RECORD_SECONDS = 3
         
-        self.audio = pyaudio.PyAudio()
+        # Audio injectable (mode headless sans PyAudio)
+        self.audio = None
+        if audio_source is None or audio_sink is None:
+            self.audio = pyaudio.PyAudio()
+        self.audio_source = audio_source or PyAudioSource(self.audio, self.RATE)
+        self.audio_sink = audio_sink or PyAudioSink(self.audio, self.RATE)
+        
+        # Files du pipeline
+        self.max_pending_playback = max_pending_playback
+        self.playback_queue = queue.Queue(maxsize=max_pending_playback)
+        self.capture_queue = queue.Queue()
+        self.send_queue = queue.Queue()
+        self.workers = []
+        self.server_capabilities = {}
+        
+        # Mesures: attente en file avant lecture (secondes), clips jetés
+        self.playback_latencies = deque(maxlen=1000)
+        self.dropped_clips = 0
+        
+        # Deux producteurs (réception TCP et UDP): jeter + remplacer doit être atomique
+        self.playback_lock = threading.Lock()
         
     def connect(self, username):
         """Se connecter au serveur"""
         try:
             self.username = username
+            
+            # Attendre la fin des workers d'une connexion précédente
+            for thread in self.workers:
+                thread.join(timeout=1)
+            self.workers = []
+            self.playback_queue = queue.Queue(maxsize=self.max_pending_playback)
+            self.capture_queue = queue.Queue()
+            self.send_queue = queue.Queue()
+            
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.connect((self.host, self.port))
             
-            # Envoyer le username
-            username_bytes = username.encode('utf-8')
-            self.socket.send(struct.pack('!I', len(username_bytes)))
-            self.socket.send(username_bytes)
+            if self.ssl_context:
+                self.socket = self.ssl_context.wrap_socket(
+                    self.socket, server_hostname=self.server_hostname, session=self.tls_session)
+            
+            # Poignée de main: HELLO (nom + capacités) -> WELCOME
+            self.socket.sendall(protocol.encode_frame(protocol.HELLO, {
+                'username': username,
+                'capabilities': self.client_capabilities()}))
+            
+            recv_exact = protocol.socket_reader(self.socket)
+            msg_type, _, reply = protocol.read_frame(recv_exact)
+            if msg_type == protocol.ERROR:
+                raise ConnectionError(reply.get('message') if reply else "refusé par le serveur")
+            if msg_type != protocol.WELCOME:
+                raise protocol.ProtocolError("WELCOME attendu")
+            self.server_capabilities = reply.get('capabilities') or {}
+            
+            if self.ssl_context:
+                # Les tickets TLS 1.3 arrivent avec le WELCOME: session réutilisable
+                resumed = " (session reprise)" if self.socket.session_reused else ""
+                print(f"🔒 {self.socket.version()} {self.socket.cipher()[0]}{resumed}")
+                self.tls_session = self.socket.session
+            
+            udp = self.server_capabilities.get('udp')
+            if udp:
+                from media_udp import UDPMediaClient
+                self.media = UDPMediaClient(self.host, udp['port'], bytes.fromhex(udp['token']),
+                                            self.receive_audio)
+                print(f"📡 Audio via UDP (port {udp['port']})")
+                print("⚠️  Audio UDP non chiffré: voix et jeton de session circulent en clair")
+            elif self.use_udp:
+                print(f"ℹ️  Audio via TCP: UDP non accordé{' (TLS actif)' if self.ssl_context else ''}")
             
             self.running = True
             print(f"✅ Connecté au serveur comme '{username}'")
             print("=" * 60)
             
-            # Démarrer le thread de réception
-            receive_thread = threading.Thread(target=self.receive_messages)
-            receive_thread.daemon = True
-            receive_thread.start()
+            # Démarrer les threads du pipeline, liés à cette connexion et à ses files
+            sock = self.socket
+            for target, args in ((self.receive_messages, (sock, recv_exact)),
+                                 (self.playback_worker, (self.playback_queue,)),
+                                 (self.capture_worker, (self.capture_queue, self.send_queue)),
+                                 (self.send_worker, (sock, self.send_queue))):
+                thread = threading.Thread(target=target, args=args)
+                thread.daemon = True
+                thread.start()
+                self.workers.append(thread)
             
             return True
             
         except Exception as e:
             print(f"❌ Erreur de connexion: {e}")
+            if self.media:
+                self.media.close()
+                self.media = None
+            if self.socket:
+                try:
+                    self.socket.close()
+                except OSError:
+                    pass
+                self.socket = None
             return False
     
-    def receive_messages(self):
-        """Recevoir et traiter les messages du serveur"""
+    def client_capabilities(self):
+        """Capacités annoncées dans le HELLO"""
+        return {
+            'version': protocol.PROTOCOL_VERSION,
+            'rate': self.RATE,
+            'channels': 1,
+            'codecs': ['wav'],
+            'features': ['search', 'rooms', 'ai'],
+            'udp': self.use_udp and not self.ssl_context,
+        }
+    
+    def receive_messages(self, sock, recv_exact):
+        """Recevoir et décoder les trames du serveur (aucun traitement bloquant ici)"""
         while self.running:
             try:
-                # Recevoir le type de message
-                msg_type_data = self.socket.recv(1)
-                if not msg_type_data:
-                    break
+                try:
+                    msg_type, flags, fields = protocol.read_frame(recv_exact)
+                except protocol.MalformedMessage as e:
+                    print(f"⚠️  Message invalide ignoré: {e}")
+                    continue
                 
-                msg_type = struct.unpack('B', msg_type_data)[0]
+                if fields is None:
+                    # Type inconnu (serveur plus récent): déjà ignoré
+                    continue
                 
-                if msg_type == 1:  # Audio
-                    self.receive_audio()
-                elif msg_type == 2:  # Texte
-                    self.receive_text()
-                elif msg_type == 3:  # Liste utilisateurs
-                    self.receive_user_list()
+                if msg_type == protocol.AUDIO:
+                    self.receive_audio(fields['username'], fields['audio'])
+                elif msg_type == protocol.TEXT:
+                    print(f"💬 {fields['username']}: {fields['message']}")
+                elif msg_type == protocol.USER_LIST:
+                    self.receive_user_list(fields['users'])
+                elif msg_type == protocol.SEARCH_RESULTS:
+                    self.receive_search_results(fields['results'])
+                elif msg_type == protocol.ERROR:
+                    print(f"❌ Serveur: {fields.get('message')}")
                     
+            except ConnectionError:
+                break
             except Exception as e:
                 if self.running:
                     print(f"❌ Erreur réception: {e}")
                 break
         
-        self.disconnect()
+        # Ne pas fermer une connexion plus récente (reconnect)
+        if self.socket is sock:
+            self.disconnect()
     
-    def receive_audio(self):
-        """Recevoir et jouer un message audio"""
-        try:
-            # Recevoir le username
-            username_length = struct.unpack('!I', self.socket.recv(4))[0]
-            username = self.socket.recv(username_length).decode('utf-8')
-            
-            # Recevoir la taille audio
-            audio_size = struct.unpack('!I', self.socket.recv(4))[0]
-            
-            # Recevoir les données audio
-            audio_data = b''
-            remaining = audio_size
-            while remaining > 0:
-                chunk = self.socket.recv(min(remaining, 4096))
-                if not chunk:
-                    break
-                audio_data += chunk
-                remaining -= len(chunk)
-            
-            if len(audio_data) == audio_size:
-                print(f"🎵 Audio reçu de {username}")
-                self.play_audio(audio_data)
-            
-        except Exception as e:
-            print(f"❌ Erreur réception audio: {e}")
+    def receive_audio(self, username, audio_data):
+        """Placer un message audio reçu dans la file de lecture"""
+        print(f"🎵 Audio reçu de {username}")
+        item = (username, audio_data, time.perf_counter())
+        with self.playback_lock:
+            try:
+                self.playback_queue.put_nowait(item)
+            except queue.Full:
+                # Lecture en retard: jeter le clip le plus ancien plutôt que bloquer la réception
+                try:
+                    self.playback_queue.get_nowait()
+                    self.dropped_clips += 1
+                except queue.Empty:
+                    pass
+                self.playback_queue.put_nowait(item)
     
-    def receive_text(self):
-        """Recevoir un message texte"""
-        try:
-            # Recevoir le username
-            username_length = struct.unpack('!I', self.socket.recv(4))[0]
-            username = self.socket.recv(username_length).decode('utf-8')
-            
-            # Recevoir le message
-            msg_length = struct.unpack('!I', self.socket.recv(4))[0]
-            message = self.socket.recv(msg_length).decode('utf-8')
-            
-            print(f"💬 {username}: {message}")
+    def receive_user_list(self, users):
+        """Mettre à jour la liste des utilisateurs"""
+        self.connected_users = users
+        if users:
+            print(f"👥 Utilisateurs connectés: {', '.join(users)}")
+        else:
+            print("👥 Aucun autre utilisateur connecté")
+    
+    def receive_search_results(self, results):
+        """Afficher les résultats d'une recherche"""
+        if not results:
+            print("🔎 Aucun résultat")
+            return
+        
+        print(f"🔎 {len(results)} résultat(s):")
+        for result in results:
+            icon = "🎙️" if result['kind'] == 'transcript' else "💬"
+            print(f"  {icon} [{result['timestamp']}] {result['username']}: {result['text']}")
+    
+    def playback_worker(self, playback_queue):
+        """Jouer les clips reçus, un par un, sur le flux de sortie persistant"""
+        while self.running:
+            try:
+                item = playback_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
             
-        except Exception as e:
-            print(f"❌ Erreur réception texte: {e}")
+            username, audio_data, received_at = item
+            self.playback_latencies.append(time.perf_counter() - received_at)
+            try:
+                self.audio_sink.play(audio_data)
+                print("🔊 Lecture terminée")
+            except Exception as e:
+                print(f"❌ Erreur lecture audio: {e}")
     
-    def receive_user_list(self):
-        """Recevoir la liste des utilisateurs"""
-        try:
-            list_length = struct.unpack('!I', self.socket.recv(4))[0]
-            users_str = self.socket.recv(list_length).decode('utf-8')
+    def capture_worker(self, capture_queue, send_queue):
+        """Enregistrer à la demande et placer l'audio dans la file d'envoi"""
+        while self.running:
+            try:
+                seconds = capture_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if seconds is None:
+                break
             
-            if users_str:
-                self.connected_users = users_str.split(',')
-                print(f"👥 Utilisateurs connectés: {users_str}")
-            else:
-                self.connected_users = []
-                print("👥 Aucun autre utilisateur connecté")
+            try:
+                audio_data = self.record_audio(seconds)
                 
-        except Exception as e:
-            print(f"❌ Erreur réception liste: {e}")
+                # Le serveur ferme la connexion sur une trame trop grande
+                max_size = self.server_capabilities.get('max_frame_size')
+                if max_size and len(audio_data) + protocol.HEADER.size + 2 > max_size:
+                    print(f"⚠️  Clip trop long ({len(audio_data)} octets, max {max_size}): non envoyé")
+                    continue
+                
+                if self.media:
+                    self.media.send_audio(audio_data)
+                else:
+                    send_queue.put(protocol.encode_frame(protocol.AUDIO, {'audio': audio_data}))
+                print("📤 Audio envoyé")
+            except Exception as e:
+                print(f"❌ Erreur envoi audio: {e}")
     
-    def record_audio(self):
-        """Enregistrer de l'audio depuis le micro"""
-        print(f"🎤 Enregistrement pendant {self.RECORD_SECONDS} secondes...")
-        
-        stream = self.audio.open(
-            format=self.FORMAT,
-            channels=self.CHANNELS,
-            rate=self.RATE,
-            input=True,
-            frames_per_buffer=self.CHUNK
-        )
-        
-        frames = []
-        for i in range(0, int(self.RATE / self.CHUNK * self.RECORD_SECONDS)):
-            data = stream.read(self.CHUNK)
-            frames.append(data)
-        
-        stream.stop_stream()
-        stream.close()
-        
-        # Convertir en bytes WAV
-        audio_buffer = io.BytesIO()
-        with wave.open(audio_buffer, 'wb') as wf:
-            wf.setnchannels(self.CHANNELS)
-            wf.setsampwidth(self.audio.get_sample_size(self.FORMAT))
-            wf.setframerate(self.RATE)
-            wf.writeframes(b''.join(frames))
+    def send_worker(self, sock, send_queue):
+        """Seul thread écrivant sur le socket: les trames ne s'entremêlent jamais"""
+        while self.running:
+            try:
+                frame = send_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if frame is None:
+                break
+            
+            try:
+                sock.sendall(frame)
+            except Exception as e:
+                if self.running:
+                    print(f"❌ Erreur envoi: {e}")
+                break
+    
+    def enqueue_frame(self, frame):
+        """Placer une trame complète dans la file d'envoi"""
+        self.send_queue.put(frame)
+    
+    def record_audio(self, seconds=None):
+        """Enregistrer de l'audio depuis la source (micro par défaut)"""
+        seconds = seconds or self.RECORD_SECONDS
+        print(f"🎤 Enregistrement pendant {seconds} secondes...")
         
-        audio_data = audio_buffer.getvalue()
+        audio_data = self.audio_source.record(seconds)
         print(f"✅ Enregistré ({len(audio_data)} bytes)")
         
         return audio_data
     
-    def play_audio(self, audio_data):
-        """Jouer des données audio"""
+    def send_audio(self, seconds=None):
+        """Demander un enregistrement + envoi (non bloquant pour la CLI)"""
+        self.capture_queue.put(seconds or self.RECORD_SECONDS)
+    
+    def send_text(self, message):
+        """Envoyer un message texte"""
         try:
-            # Lire le WAV depuis les bytes
-            audio_buffer = io.BytesIO(audio_data)
-            with wave.open(audio_buffer, 'rb') as wf:
-                stream = self.audio.open(
-                    format=self.audio.get_format_from_width(wf.getsampwidth()),
-                    channels=wf.getnchannels(),
-                    rate=wf.getframerate(),
-                    output=True
-                )
-                
-                data = wf.readframes(self.CHUNK)
-                while data:
-                    stream.write(data)
-                    data = wf.readframes(self.CHUNK)
-                
-                stream.stop_stream()
-                stream.close()
+            self.enqueue_frame(protocol.encode_frame(protocol.TEXT, {'message': message}))
             
-            print("🔊 Lecture terminée")
+            print(f"📤 Message envoyé: {message}")
             
         except Exception as e:
-            print(f"❌ Erreur lecture audio: {e}")
+            print(f"❌ Erreur envoi texte: {e}")
     
-    def send_audio(self):
-        """Enregistrer et envoyer un message audio"""
+    def send_search(self, query):
+        """Rechercher dans les messages et transcriptions"""
         try:
-            audio_data = self.record_audio()
+            self.enqueue_frame(protocol.encode_frame(protocol.SEARCH_REQUEST, {'query': query}))
             
-            # Envoyer au serveur
-            self.socket.send(struct.pack('B', 1))  # Type: audio
-            self.socket.send(struct.pack('!I', len(audio_data)))
-            self.socket.send(audio_data)
+        except Exception as e:
+            print(f"❌ Erreur envoi recherche: {e}")
+    
+    def join_room(self, room):
+        """Rejoindre un salon"""
+        try:
+            self.enqueue_frame(protocol.encode_frame(protocol.JOIN_ROOM, {'room': room}))
             
-            print("📤 Audio envoyé")
+            self.room = room
+            print(f"🚪 Salon: #{room}")
             
         except Exception as e:
-            print(f"❌ Erreur envoi audio: {e}")
+            print(f"❌ Erreur changement de salon: {e}")
     
-    def send_text(self, message):
-        """Envoyer un message texte"""
+    def toggle_ai(self):
+        """Activer/désactiver l'assistant IA dans le salon courant"""
         try:
-            message_bytes = message.encode('utf-8')
-            
-            self.socket.send(struct.pack('B', 2))  # Type: texte
-            self.socket.send(struct.pack('!I', len(message_bytes)))
-            self.socket.send(message_bytes)
+            self.ai_enabled = not self.ai_enabled
             
-            print(f"📤 Message envoyé: {message}")
+            self.enqueue_frame(protocol.encode_frame(protocol.AI_TOGGLE, {'enabled': self.ai_enabled}))
             
         except Exception as e:
-            print(f"❌ Erreur envoi texte: {e}")
+            print(f"❌ Erreur activation assistant: {e}")
     
     def disconnect(self):
         """Se déconnecter proprement"""
+        if not self.running and not self.socket:
+            return
         self.running = False
+        
+        # Réveiller les workers
+        for worker_queue in (self.capture_queue, self.send_queue):
+            worker_queue.put(None)
+        try:
+            self.playback_queue.put_nowait(None)
+        except queue.Full:
+            pass
+        
+        if self.media:
+            self.media.close()
+            self.media = None
+        
         if self.socket:
+            try:
+                # shutdown réveille le thread de réception bloqué dans recv()
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             try:
                 self.socket.close()
             except:
                 pass
+            self.socket = None
         print("👋 Déconnecté du serveur")
     
+    def reconnect(self):
+        """Se reconnecter (reprise de session TLS si disponible)"""
+        self.disconnect()
+        return self.connect(self.username)
+    
     def run_cli(self):
         """Interface en ligne de commande"""
         print("\n" + "=" * 60)
@@ -241,6 +394,9 @@ class VocalChatClient:
         print("=" * 60)
         print("  v ou voice  - Enregistrer et envoyer un message vocal")
         print("  t ou text   - Envoyer un message texte")
+        print("  s ou search - Rechercher dans les messages et transcriptions")
+        print("  r ou room   - Changer de salon")
+        print("  a ou ai     - Activer/désactiver l'assistant IA du salon")
         print("  u ou users  - Voir les utilisateurs connectés")
         print("  q ou quit   - Quitter")
         print("=" * 60 + "\n")
@@ -257,6 +413,19 @@ class VocalChatClient:
                     if message:
                         self.send_text(message)
                     
+                elif cmd in ['s', 'search']:
+                    query = input("Recherche> ").strip()
+                    if query:
+                        self.send_search(query)
+                    
+                elif cmd in ['r', 'room']:
+                    room = input("Salon> ").strip()
+                    if room:
+                        self.join_room(room)
+                    
+                elif cmd in ['a', 'ai']:
+                    self.toggle_ai()
+                    
                 elif cmd in ['u', 'users']:
                     if self.connected_users:
                         print(f"👥 Utilisateurs: {', '.join(self.connected_users)}")
@@ -281,7 +450,10 @@ class VocalChatClient:
     def cleanup(self):
         """Nettoyer les ressources"""
         self.disconnect()
-        self.audio.terminate()
+        self.audio_source.close()
+        self.audio_sink.close()
+        if self.audio:
+            self.audio.terminate()
 
 
 if __name__ == "__main__":
@@ -292,13 +464,24 @@ if __name__ == "__main__":
     server_host = input("Adresse du serveur [127.0.0.1]: ").strip() or "127.0.0.1"
     server_port = input("Port [5555]: ").strip() or "5555"
     username = input("Votre nom d'utilisateur: ").strip()
+    use_tls = input("TLS [o/N]: ").strip().lower() in ['o', 'oui', 'y', 'yes']
+    # L'audio UDP n'est pas chiffré: proposé seulement sans TLS
+    use_udp = not use_tls and input("Audio en UDP (faible latence, non chiffré) [o/N]: ").strip().lower() \
+        in ['o', 'oui', 'y', 'yes']
     
     if not username:
         print("❌ Nom d'utilisateur requis!")
         exit(1)
     
     # Créer et connecter le client
-    client = VocalChatClient(host=server_host, port=int(server_port))
+    ssl_context = None
+    if use_tls:
+        import tls
+        cafile = input("Certificat du serveur [certs/cert.pem]: ").strip() or "certs/cert.pem"
+        ssl_context = tls.client_context(cafile)
+    
+    client = VocalChatClient(host=server_host, port=int(server_port), ssl_context=ssl_context,
+                             use_udp=use_udp)
     
     try:
         if client.connect(username):
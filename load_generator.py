@@ -0,0 +1,271 @@
+import os
+import time
+import socket
+import argparse
+import threading
+import contextlib
+from collections import Counter
+
+import protocol
+from audio_io import pcm_to_wav, RATE
+
+
+class LoadClient:
+    def __init__(self, host, port, username, room=None, ssl_context=None):
+        """
+        Client synthétique: protocole brut, sans audio ni IA
+
+        Args:
+            host: Adresse du serveur
+            port: Port du serveur
+            username: Nom annoncé dans le HELLO
+            room: Salon à rejoindre (None: salon par défaut)
+            ssl_context: Contexte TLS client optionnel
+        """
+        self.username = username
+        self.sent = Counter()      # {type: trames envoyées}
+        self.sent_bytes = 0
+        self.received = Counter()  # {type: trames reçues}
+        self.received_bytes = 0
+        self.errors = Counter()    # {code ERROR: nombre}
+        self.rejected = None       # Code d'erreur si la connexion a été refusée
+        self.send_lock = threading.Lock()
+
+        self.sock = socket.create_connection((host, port), timeout=10)
+        if ssl_context:
+            self.sock = ssl_context.wrap_socket(self.sock, server_hostname=host)
+        self.recv_exact = protocol.socket_reader(self.sock)
+
+        self.sock.sendall(protocol.encode_frame(protocol.HELLO, {
+            'username': username, 'capabilities': {'version': protocol.PROTOCOL_VERSION}}))
+        msg_type, _, reply = protocol.read_frame(self.recv_exact)
+        if msg_type != protocol.WELCOME:
+            self.rejected = (reply or {}).get('code', 'refused')
+            self.sock.close()
+            return
+        self.sock.settimeout(None)
+
+        if room:
+            self.send(protocol.JOIN_ROOM, {'room': room})
+
+        self.thread = threading.Thread(target=self.receive_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def send(self, msg_type, fields):
+        frame = protocol.encode_frame(msg_type, fields)
+        with self.send_lock:
+            self.sock.sendall(frame)
+        self.sent[msg_type] += 1
+        self.sent_bytes += len(frame)
+
+    def send_raw(self, data):
+        with self.send_lock:
+            self.sock.sendall(data)
+
+    def receive_loop(self):
+        while True:
+            try:
+                msg_type, _, fields = protocol.read_frame(self.recv_exact)
+            except (OSError, protocol.ProtocolError):
+                break
+            self.received[msg_type] += 1
+            if msg_type == protocol.AUDIO:
+                self.received_bytes += len(fields['audio'])
+            elif msg_type == protocol.ERROR:
+                self.errors[fields.get('code', '?')] += 1
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def run_load(host='127.0.0.1', port=5555, clients=20, duration=10.0, rooms=1,
+             audio_rate=2.0, clip_seconds=1.0, text_rate=5.0, oversized=0,
+             extra_connections=0, ssl_context=None):
+    """
+    Générer une charge réaliste (audio + texte) et mesurer ce que le serveur laisse passer
+
+    Args:
+        clients: Clients actifs
+        duration: Durée de l'envoi (s)
+        rooms: Nombre de salons entre lesquels répartir les clients
+        audio_rate: Clips audio par seconde et par client
+        clip_seconds: Durée de chaque clip
+        text_rate: Messages texte par seconde et par client
+        oversized: Clients qui envoient en plus une trame AUDIO de 64 Mo annoncés
+        extra_connections: Connexions inactives ouvertes en plus (test de la limite)
+
+    Returns:
+        dict: Statistiques agrégées côté clients
+    """
+    print(f"🏋️  Charge: {clients} clients, {rooms} salon(s), {duration}s, "
+          f"{audio_rate} clips/s de {clip_seconds}s + {text_rate} textes/s par client")
+
+    audio = pcm_to_wav(os.urandom(2 * int(RATE * clip_seconds)))
+    stats = Counter()
+    active = []
+
+    # Connexions (les refus du serveur plein sont comptés, pas fatals)
+    for i in range(clients + extra_connections):
+        room = f"salon{i % rooms}" if rooms > 1 else None
+        try:
+            client = LoadClient(host, port, f"charge{i}", room, ssl_context)
+        except OSError as e:
+            stats['connect_errors'] += 1
+            print(f"❌ Connexion charge{i}: {e}")
+            continue
+        if client.rejected:
+            stats[f"refused_{client.rejected}"] += 1
+        else:
+            active.append(client)
+    workers = active[:clients]
+
+    def drive(client, index):
+        # Chaque client alterne audio et texte à intervalles réguliers
+        events = []
+        if audio_rate > 0:
+            events.append([0.0, 1.0 / audio_rate, protocol.AUDIO])
+        if text_rate > 0:
+            events.append([0.0, 1.0 / text_rate, protocol.TEXT])
+        start = time.perf_counter()
+        sequence = 0
+        try:
+            if index < oversized:
+                # En-tête annonçant 64 Mo: doit être refusé avant allocation
+                client.send_raw(protocol.HEADER.pack(
+                    protocol.PROTOCOL_VERSION, protocol.AUDIO, 0, 64 * 1024 * 1024))
+                return
+            while events:
+                event = min(events, key=lambda e: e[0])
+                elapsed = time.perf_counter() - start
+                if event[0] >= duration:
+                    break
+                if event[0] > elapsed:
+                    time.sleep(event[0] - elapsed)
+                if event[2] == protocol.AUDIO:
+                    client.send(protocol.AUDIO, {'audio': audio})
+                else:
+                    sequence += 1
+                    client.send(protocol.TEXT, {'message': f"message {sequence} de {client.username}"})
+                event[0] += event[1]
+        except OSError:
+            stats['send_errors'] += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=drive, args=(c, i), daemon=True) for i, c in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    time.sleep(1.0)  # Laisser arriver les derniers relais
+    elapsed = time.perf_counter() - start
+
+    for client in active:
+        stats['frames_sent'] += sum(client.sent.values())
+        stats['bytes_sent'] += client.sent_bytes
+        stats['audio_received'] += client.received[protocol.AUDIO]
+        stats['text_received'] += client.received[protocol.TEXT]
+        stats['audio_bytes_received'] += client.received_bytes
+        for code, count in client.errors.items():
+            stats[f"error_{code}"] += count
+        client.close()
+
+    stats['connected'] = len(active)
+    stats['elapsed'] = elapsed
+    report_load(stats)
+    return stats
+
+
+def report_load(stats):
+    """Afficher les statistiques côté clients"""
+    elapsed = stats['elapsed']
+    print("-" * 60)
+    print(f"🔌 Connectés: {stats['connected']}, refusés: {stats['refused_server_full']}")
+    print(f"📤 Envoyé: {stats['frames_sent']} trames, {stats['bytes_sent'] / elapsed / 1e6:.2f} Mo/s")
+    print(f"📥 Reçu: {stats['audio_received']} clips, {stats['text_received']} textes, "
+          f"{stats['audio_bytes_received'] / elapsed / 1e6:.2f} Mo/s d'audio")
+    print(f"🚦 Avertissements de débit: {stats['error_rate_limited']}, "
+          f"trames trop grandes: {stats['error_frame_too_large']}")
+
+
+def run_local(limits, **load_options):
+    """Démarrer un serveur dans ce processus, le charger, puis afficher ses compteurs"""
+    import tempfile
+    from serveur import VocalChatServer
+
+    server = VocalChatServer(host='127.0.0.1', port=0, index_dir=tempfile.mkdtemp(prefix='vocal_load_'),
+                             limits=limits)
+
+    # Le serveur journalise chaque message: sortie masquée pendant la charge
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        threading.Thread(target=server.start, daemon=True).start()
+        while not server.running:
+            time.sleep(0.01)
+        port = server.server_socket.getsockname()[1]
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        stats = run_load('127.0.0.1', port, **load_options)
+        report = server.limits_report()
+        server.stop()
+
+    report_load(stats)
+    print("🚦 Compteurs serveur:")
+    for key, value in report.items():
+        print(f"   {key}: {value}")
+    return stats, report
+
+
+if __name__ == "__main__":
+    from rate_limit import ServerLimits
+
+    parser = argparse.ArgumentParser(description="Générateur de charge pour le serveur de chat vocal")
+    parser.add_argument('--host', default='127.0.0.1', help="Adresse du serveur")
+    parser.add_argument('--port', type=int, default=5555, help="Port du serveur")
+    parser.add_argument('--tls', metavar='CAFILE', help="Se connecter en TLS (certificat de confiance)")
+    parser.add_argument('-c', '--clients', type=int, default=20, help="Clients actifs")
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help="Durée (s)")
+    parser.add_argument('--rooms', type=int, default=1, help="Nombre de salons")
+    parser.add_argument('--audio-rate', type=float, default=2.0, help="Clips/s par client")
+    parser.add_argument('--clip-seconds', type=float, default=1.0, help="Durée d'un clip (s)")
+    parser.add_argument('--text-rate', type=float, default=5.0, help="Textes/s par client")
+    parser.add_argument('--oversized', type=int, default=0, help="Clients envoyant une trame géante")
+    parser.add_argument('--extra-connections', type=int, default=0,
+                        help="Connexions supplémentaires (test de la limite de connexions)")
+
+    # Serveur local avec des limites choisies (sinon: serveur distant existant)
+    parser.add_argument('--local', action='store_true', help="Lancer un serveur dans ce processus")
+    parser.add_argument('--max-connections', type=int, default=256)
+    parser.add_argument('--max-frame-size', type=int, default=2 * 1024 * 1024)
+    parser.add_argument('--user-msgs', type=float, default=20, help="Messages/s par utilisateur")
+    parser.add_argument('--user-bytes', type=float, default=256 * 1024, help="Octets/s par utilisateur")
+    parser.add_argument('--room-msgs', type=float, default=100, help="Messages/s par salon")
+    parser.add_argument('--room-bytes', type=float, default=1024 * 1024, help="Octets/s par salon")
+    args = parser.parse_args()
+
+    load_options = dict(clients=args.clients, duration=args.duration, rooms=args.rooms,
+                        audio_rate=args.audio_rate, clip_seconds=args.clip_seconds,
+                        text_rate=args.text_rate, oversized=args.oversized,
+                        extra_connections=args.extra_connections)
+
+    if args.local:
+        limits = ServerLimits(max_connections=args.max_connections,
+                              max_frame_size=args.max_frame_size,
+                              user_messages_per_sec=args.user_msgs,
+                              user_message_burst=2 * args.user_msgs,
+                              user_bytes_per_sec=args.user_bytes,
+                              user_byte_burst=2 * args.user_bytes,
+                              room_messages_per_sec=args.room_msgs,
+                              room_message_burst=2 * args.room_msgs,
+                              room_bytes_per_sec=args.room_bytes,
+                              room_byte_burst=2 * args.room_bytes)
+        run_local(limits, **load_options)
+    else:
+        ssl_context = None
+        if args.tls:
+            import tls
+            ssl_context = tls.client_context(args.tls)
+        run_load(args.host, args.port, ssl_context=ssl_context, **load_options)
@@ -0,0 +1,491 @@
+import os
+import socket
+import struct
+import threading
+import time
+
+# Client -> serveur: jeton de session, numéro de clip, fragment, nombre de fragments
+CLIENT_HEADER = struct.Struct('!8sIHH')
+# Serveur -> client: identifiant de session de l'émetteur, numéro de clip, fragment,
+# nombre de fragments, taille du username
+RELAY_HEADER = struct.Struct('!IIHHB')
+
+TOKEN_SIZE = 8
+
+# Charge utile par datagramme: sous la MTU courante, pas de fragmentation IP
+MAX_FRAGMENT = 1200
+
+
+def new_token():
+    """Jeton de session aléatoire (8 octets)"""
+    return os.urandom(TOKEN_SIZE)
+
+
+def fragment(audio_data):
+    """Découper un clip en fragments de MAX_FRAGMENT octets"""
+    return [audio_data[i:i + MAX_FRAGMENT] for i in range(0, len(audio_data), MAX_FRAGMENT)] or [b'']
+
+
+class Reassembler:
+    def __init__(self, timeout=1.0):
+        """
+        Reconstitution des clips à partir des fragments (perte et désordre tolérés)
+
+        Un clip incomplet est abandonné après timeout, ou dès qu'un clip plus
+        récent du même émetteur est complet: pas de blocage en tête de file.
+
+        Args:
+            timeout: Délai (s) avant abandon d'un clip incomplet
+        """
+        self.timeout = timeout
+        self.partial = {}  # {(émetteur, seq): [nombre, {index: données}, premier instant]}
+        self.last_seq = {}  # {émetteur: dernier seq livré}
+        self.completed = 0
+        self.lost = 0
+        self.late = 0
+        self.rejected = 0
+
+    def add(self, sender, seq, index, count, payload, now=None):
+        """
+        Ajouter un fragment
+
+        Returns:
+            bytes: Clip complet, ou None
+        """
+        now = now if now is not None else time.monotonic()
+        self.expire(now)
+
+        if seq <= self.last_seq.get(sender, -1):
+            self.late += 1
+            return None
+        if count == 0 or index >= count:
+            return None
+
+        key = (sender, seq)
+        entry = self.partial.get(key)
+        if entry is None:
+            entry = [count, {}, now]
+            self.partial[key] = entry
+        elif count != entry[0]:
+            # Nombre de fragments incohérent: fragment rejeté
+            self.rejected += 1
+            return None
+        entry[1][index] = payload
+
+        if len(entry[1]) < entry[0]:
+            return None
+
+        del self.partial[key]
+        self.last_seq[sender] = seq
+        self.completed += 1
+
+        # Les clips plus anciens encore incomplets ne seront jamais joués
+        for old in [k for k in self.partial if k[0] == sender and k[1] < seq]:
+            del self.partial[old]
+            self.lost += 1
+
+        return b''.join(entry[1][i] for i in range(entry[0]))
+
+    def forget(self, sender):
+        """Oublier l'état d'un émetteur (fin de session)"""
+        self.last_seq.pop(sender, None)
+        for key in [k for k in self.partial if k[0] == sender]:
+            del self.partial[key]
+
+    def expire(self, now):
+        for key in [k for k, v in self.partial.items() if now - v[2] > self.timeout]:
+            del self.partial[key]
+            self.lost += 1
+
+
+class UDPMediaRelay:
+    def __init__(self, server, host='0.0.0.0', port=5556):
+        """
+        Plan média UDP du serveur: relais des fragments audio aux membres du salon
+
+        Les membres sans UDP reçoivent le clip reconstitué par TCP.
+
+        Args:
+            server: VocalChatServer hôte (clients, salons, assistant)
+            host: Adresse d'écoute
+            port: Port UDP (0: choisi par le système)
+        """
+        self.server = server
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.port = self.sock.getsockname()[1]
+
+        self.tokens = {}  # {jeton: socket TCP du client}
+        # Identifiant par session: un émetteur reconnecté repart avec seq=1
+        self.sender_ids = {}  # {socket TCP du client: identifiant}
+        self.next_sender_id = 0
+        self.reassembler = Reassembler()
+        self.max_clip_size = server.limits.max_frame_size
+        self.relayed = 0
+        self.rejected = 0
+        self.throttled = 0
+
+        self.running = True
+        self.thread = threading.Thread(target=self.receive_datagrams)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def register(self, client_socket):
+        """Créer le jeton UDP d'une session TCP (à transmettre dans le WELCOME)"""
+        token = new_token()
+        with self.server.clients_lock:
+            self.tokens[token] = client_socket
+            self.next_sender_id = (self.next_sender_id + 1) & 0xFFFFFFFF
+            self.sender_ids[client_socket] = self.next_sender_id
+        return token
+
+    def unregister(self, client_socket):
+        with self.server.clients_lock:
+            for token in [t for t, s in self.tokens.items() if s is client_socket]:
+                del self.tokens[token]
+            sender_id = self.sender_ids.pop(client_socket, None)
+            if sender_id is not None:
+                self.reassembler.forget(sender_id)
+
+    def receive_datagrams(self):
+        """Boucle de réception UDP"""
+        while self.running:
+            try:
+                datagram, addr = self.sock.recvfrom(65536)
+            except OSError:
+                break
+
+            try:
+                self.handle_datagram(datagram, addr)
+            except Exception as e:
+                print(f"❌ Erreur relais UDP: {e}")
+
+    def handle_datagram(self, datagram, addr):
+        if len(datagram) < CLIENT_HEADER.size:
+            self.rejected += 1
+            return
+
+        token, seq, index, count = CLIENT_HEADER.unpack_from(datagram)
+        payload = datagram[CLIENT_HEADER.size:]
+
+        # Taille de clip bornée comme en TCP, avant toute mise en mémoire
+        if len(payload) > MAX_FRAGMENT or count * MAX_FRAGMENT > self.max_clip_size + MAX_FRAGMENT:
+            self.rejected += 1
+            return
+
+        with self.server.clients_lock:
+            client_socket = self.tokens.get(token)
+            info = self.server.clients.get(client_socket)
+            if info is None:
+                # Jeton inconnu: datagramme usurpé ou session terminée
+                self.rejected += 1
+                return
+
+            # Enregistrement (ou changement d'adresse, NAT) sur tout datagramme valide
+            info['udp_addr'] = addr
+            if count == 0:
+                return
+
+            username = info['username']
+            room = info['room']
+            sender_id = self.sender_ids[client_socket]
+
+            # Mêmes seaux que le TCP; le clip compte comme un message (premier fragment)
+            if not self.server.rate_limiter.allow(client_socket, len(payload), room,
+                                                  messages=1 if index == 0 else 0):
+                self.throttled += 1
+                return
+
+            username_bytes = username.encode('utf-8')[:255]
+            relay = (RELAY_HEADER.pack(sender_id, seq, index, count, len(username_bytes))
+                     + username_bytes + payload)
+
+            # Relais immédiat de chaque fragment aux membres UDP du salon
+            for other, other_info in self.server.clients.items():
+                if other is not client_socket and other_info['room'] == room \
+                        and other_info.get('udp_addr'):
+                    try:
+                        self.sock.sendto(relay, other_info['udp_addr'])
+                        self.relayed += 1
+                    except OSError:
+                        pass
+
+            # Sous le verrou: unregister() ne peut pas être suivi d'un ajout tardif
+            audio_data = self.reassembler.add(sender_id, seq, index, count, payload)
+
+        # Clip complet: membres TCP seulement, et assistant IA
+        if audio_data is not None and self.server.check_audio(username, audio_data):
+            self.server.broadcast_audio(client_socket, username, audio_data, room, skip_udp=True)
+            if self.server.assistant:
+                self.server.assistant.submit(room, username, audio_data)
+
+    def stop(self):
+        self.running = False
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class UDPMediaClient:
+    def __init__(self, host, port, token, on_audio):
+        """
+        Transport UDP côté client pour l'audio
+
+        Args:
+            host: Adresse du serveur
+            port: Port UDP annoncé dans le WELCOME
+            token: Jeton de session (bytes)
+            on_audio: fonction(username, audio_data) appelée par clip complet
+        """
+        self.token = token
+        self.on_audio = on_audio
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.connect((host, port))
+        self.sock.settimeout(0.5)
+        self.seq = 0
+        self.reassembler = Reassembler()
+
+        self.running = True
+        self.thread = threading.Thread(target=self.receive_datagrams)
+        self.thread.daemon = True
+        self.thread.start()
+
+        # Enregistrement de l'adresse (répété: l'UDP peut perdre un datagramme)
+        for _ in range(3):
+            self.sock.send(CLIENT_HEADER.pack(self.token, 0, 0, 0))
+
+    def send_audio(self, audio_data):
+        """Envoyer un clip en fragments numérotés"""
+        self.seq += 1
+        fragments = fragment(audio_data)
+        for index, payload in enumerate(fragments):
+            self.sock.send(CLIENT_HEADER.pack(self.token, self.seq, index, len(fragments)) + payload)
+
+    def receive_datagrams(self):
+        """Boucle de réception des fragments relayés"""
+        while self.running:
+            try:
+                datagram = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            # Un datagramme invalide ne doit pas arrêter la réception
+            try:
+                self.handle_datagram(datagram)
+            except Exception as e:
+                print(f"❌ Erreur réception UDP: {e}")
+
+    def handle_datagram(self, datagram):
+        if len(datagram) < RELAY_HEADER.size:
+            return
+        sender_id, seq, index, count, name_size = RELAY_HEADER.unpack_from(datagram)
+        start = RELAY_HEADER.size
+        try:
+            username = datagram[start:start + name_size].decode('utf-8')
+        except UnicodeDecodeError:
+            return
+
+        audio_data = self.reassembler.add(sender_id, seq, index, count,
+                                          datagram[start + name_size:])
+        if audio_data is not None:
+            self.on_audio(username, audio_data)
+
+    def close(self):
+        self.running = False
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+# --- Banc d'essai en boucle locale: perte et désordre injectés ---
+
+class LossyDatagramSocket:
+    def __init__(self, sock, loss=0.05, reorder=0.05, seed=0):
+        """
+        Enveloppe d'un socket UDP qui perd et réordonne les datagrammes reçus
+
+        Args:
+            sock: Socket UDP connecté
+            loss: Probabilité de perte d'un datagramme
+            reorder: Probabilité de retarder un datagramme derrière le suivant
+        """
+        import random
+
+        self.sock = sock
+        self.loss = loss
+        self.reorder = reorder
+        self.rng = random.Random(seed)
+        self.held = None
+        self.ready = []
+
+    def recv(self, size):
+        while True:
+            if self.ready:
+                return self.ready.pop(0)
+            try:
+                datagram = self.sock.recv(size)
+            except socket.timeout:
+                # Libérer un datagramme retenu si plus rien n'arrive
+                if self.held is not None:
+                    held, self.held = self.held, None
+                    return held
+                raise
+            if self.rng.random() < self.loss:
+                continue
+            if self.held is None and self.rng.random() < self.reorder:
+                self.held = datagram
+                continue
+            if self.held is not None:
+                self.ready.append(self.held)
+                self.held = None
+            return datagram
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+
+class LossyTCPProxy:
+    def __init__(self, target, loss=0.05, rto=0.2, seed=0):
+        """
+        Proxy TCP modélisant la perte côté serveur -> client
+
+        Un segment « perdu » est retransmis après rto: il retarde tous les
+        octets suivants (blocage en tête de file de TCP).
+
+        Args:
+            target: (hôte, port) du serveur
+            loss: Probabilité de perte par segment (1448 octets)
+            rto: Délai de retransmission (s), 200 ms minimum sous Linux
+        """
+        import random
+
+        self.target = target
+        self.loss = loss
+        self.rto = rto
+        self.rng = random.Random(seed)
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(8)
+        self.port = self.listener.getsockname()[1]
+
+        thread = threading.Thread(target=self.accept_loop)
+        thread.daemon = True
+        thread.start()
+
+    def accept_loop(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            upstream = socket.create_connection(self.target)
+            for src, dst, lossy in ((client, upstream, False), (upstream, client, True)):
+                thread = threading.Thread(target=self.pump, args=(src, dst, lossy))
+                thread.daemon = True
+                thread.start()
+
+    def pump(self, src, dst, lossy):
+        try:
+            while True:
+                data = src.recv(1448)
+                if not data:
+                    break
+                if lossy and self.rng.random() < self.loss:
+                    time.sleep(self.rto)
+                dst.sendall(data)
+        except OSError:
+            pass
+        finally:
+            for s in (src, dst):
+                try:
+                    s.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    def close(self):
+        self.listener.close()
+
+
+def compare_transports(loss=0.05, reorder=0.05, clips=40, interval=0.1, clip_seconds=0.25):
+    """Comparer la latence audio de bout en bout: TCP seul vs plan média UDP"""
+    import tempfile
+    import wave
+    import io
+    from serveur import VocalChatServer
+    from client import VocalChatClient
+    from audio_io import MemorySource, MemorySink, pcm_to_wav, RATE
+
+    print("🧪 BANC D'ESSAI TCP vs UDP")
+    print(f"   perte {loss:.0%}, désordre {reorder:.0%}, {clips} clips de {clip_seconds}s")
+    print("=" * 60)
+
+    silence = b'\x00\x00' * int(RATE * clip_seconds)
+    payloads = [pcm_to_wav(struct.pack('!I', i) + silence[4:]) for i in range(clips)]
+
+    def clip_index(audio_data):
+        with wave.open(io.BytesIO(audio_data), 'rb') as wf:
+            return struct.unpack('!I', wf.readframes(2))[0]
+
+    results = {}
+    for mode in ('tcp', 'udp'):
+        server = VocalChatServer(host='127.0.0.1', port=0, index_dir=tempfile.mkdtemp(),
+                                 udp_port=0 if mode == 'udp' else None)
+        threading.Thread(target=server.start, daemon=True).start()
+        while not server.running:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        port = server.server_socket.getsockname()[1]
+
+        proxy = None
+        receiver_port = port
+        if mode == 'tcp':
+            proxy = LossyTCPProxy(('127.0.0.1', port), loss=loss)
+            receiver_port = proxy.port
+
+        sink = MemorySink()
+        sender = VocalChatClient(port=port, audio_source=MemorySource(payloads),
+                                 audio_sink=MemorySink(), use_udp=(mode == 'udp'))
+        receiver = VocalChatClient(port=receiver_port, audio_source=MemorySource(),
+                                   audio_sink=sink, max_pending_playback=clips,
+                                   use_udp=(mode == 'udp'))
+        sender.connect('emetteur')
+        receiver.connect('recepteur')
+        if receiver.media:
+            receiver.media.sock = LossyDatagramSocket(receiver.media.sock, loss, reorder)
+        time.sleep(0.3)
+
+        sent_at = []
+        for _ in range(clips):
+            sent_at.append(time.perf_counter())
+            sender.send_audio(clip_seconds)
+            time.sleep(interval)
+        time.sleep(2.0)
+
+        latencies = sorted((played_at - sent_at[clip_index(audio)]) * 1000
+                           for played_at, audio in sink.played)
+        results[mode] = latencies
+
+        sender.cleanup()
+        receiver.cleanup()
+        server.stop()
+        if proxy:
+            proxy.close()
+
+    print("-" * 60)
+    for mode, latencies in results.items():
+        if not latencies:
+            print(f"{mode.upper()}: aucun clip reçu")
+            continue
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+        print(f"{mode.upper()}: {len(latencies)}/{clips} clips, "
+              f"p50 {p50:.0f} ms, p95 {p95:.0f} ms, max {latencies[-1]:.0f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    compare_transports()
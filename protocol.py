@@ -0,0 +1,368 @@
+import json
+import struct
+import time
+
+# Version du protocole (octet 0 de chaque trame)
+PROTOCOL_VERSION = 1
+
+# En-tête fixe: version, type, drapeaux, longueur totale de la trame (en-tête compris)
+HEADER = struct.Struct('!BBHI')
+
+# Taille maximale d'une trame acceptée par défaut
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+# Types de messages
+AUDIO = 1
+TEXT = 2
+USER_LIST = 3
+SEARCH_REQUEST = 4
+JOIN_ROOM = 5
+AI_TOGGLE = 6
+SEARCH_RESULTS = 7
+HELLO = 16
+WELCOME = 17
+ERROR = 18
+
+# Drapeaux (réservés, transmis tels quels)
+FLAG_NONE = 0
+
+_U16 = struct.Struct('!H')
+
+
+class ProtocolError(Exception):
+    """Flux invalide: la connexion doit être fermée"""
+
+
+class FrameTooLarge(ProtocolError):
+    """Trame annoncée au-delà de la taille autorisée (contenu non lu)"""
+
+
+class MalformedMessage(ProtocolError):
+    """Trame bien délimitée mais contenu invalide: elle a été consommée, le flux reste utilisable"""
+
+
+class Codec:
+    def __init__(self, msg_type, name, encode, decode):
+        """
+        Encodeur/décodeur du contenu d'un type de message
+
+        Args:
+            msg_type: Numéro du type (1 octet)
+            name: Nom lisible
+            encode: fonction(dict) -> bytes
+            decode: fonction(bytes) -> dict
+        """
+        self.msg_type = msg_type
+        self.name = name
+        self.encode = encode
+        self.decode = decode
+
+
+# Registre des codecs: {type: Codec}
+REGISTRY = {}
+
+
+def register(msg_type, name, encode, decode):
+    """Enregistrer un codec (un type ne peut être enregistré qu'une fois)"""
+    if msg_type in REGISTRY:
+        raise ValueError(f"Type de message déjà enregistré: {msg_type}")
+    REGISTRY[msg_type] = Codec(msg_type, name, encode, decode)
+    return REGISTRY[msg_type]
+
+
+# --- Primitives de contenu ---
+
+def _pack_str(value):
+    data = value.encode('utf-8')
+    return _U16.pack(len(data)) + data
+
+
+def _unpack_str(payload, offset):
+    (size,) = _U16.unpack_from(payload, offset)
+    offset += _U16.size
+    end = offset + size
+    if end > len(payload):
+        raise ValueError("Chaîne tronquée")
+    return bytes(payload[offset:end]).decode('utf-8'), end
+
+
+def _encode_json(fields):
+    return json.dumps(fields, ensure_ascii=False).encode('utf-8')
+
+
+def _decode_json(payload):
+    fields = json.loads(bytes(payload).decode('utf-8'))
+    if not isinstance(fields, dict):
+        raise ValueError("Objet JSON attendu")
+    return fields
+
+
+def _encode_named_data(key):
+    # username (u16 + utf-8) suivi des données brutes
+    def encode(fields):
+        value = fields[key]
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        return _pack_str(fields.get('username', '')) + value
+    return encode
+
+
+def _decode_named_data(key, as_text):
+    def decode(payload):
+        username, offset = _unpack_str(payload, 0)
+        value = bytes(payload[offset:])
+        return {'username': username, key: value.decode('utf-8') if as_text else value}
+    return decode
+
+
+def _encode_user_list(fields):
+    users = fields['users']
+    return _U16.pack(len(users)) + b''.join(_pack_str(u) for u in users)
+
+
+def _decode_user_list(payload):
+    (count,) = _U16.unpack_from(payload, 0)
+    offset = _U16.size
+    users = []
+    for _ in range(count):
+        user, offset = _unpack_str(payload, offset)
+        users.append(user)
+    return {'users': users}
+
+
+def _encode_text_field(key):
+    return lambda fields: fields[key].encode('utf-8')
+
+
+def _decode_text_field(key):
+    return lambda payload: {key: bytes(payload).decode('utf-8')}
+
+
+def _decode_ai_toggle(payload):
+    if len(payload) != 1:
+        raise ValueError("1 octet attendu")
+    return {'enabled': payload[0] == 1}
+
+
+register(AUDIO, 'audio', _encode_named_data('audio'), _decode_named_data('audio', False))
+register(TEXT, 'text', _encode_named_data('message'), _decode_named_data('message', True))
+register(USER_LIST, 'user_list', _encode_user_list, _decode_user_list)
+register(SEARCH_REQUEST, 'search_request', _encode_text_field('query'), _decode_text_field('query'))
+register(SEARCH_RESULTS, 'search_results',
+         lambda fields: json.dumps(fields['results'], ensure_ascii=False).encode('utf-8'),
+         lambda payload: {'results': json.loads(bytes(payload).decode('utf-8'))})
+register(JOIN_ROOM, 'join_room', _encode_text_field('room'), _decode_text_field('room'))
+register(AI_TOGGLE, 'ai_toggle',
+         lambda fields: bytes([1 if fields['enabled'] else 0]), _decode_ai_toggle)
+register(HELLO, 'hello', _encode_json, _decode_json)
+register(WELCOME, 'welcome', _encode_json, _decode_json)
+register(ERROR, 'error', _encode_json, _decode_json)
+
+
+# --- Trames ---
+
+def encode_frame(msg_type, fields=None, flags=FLAG_NONE):
+    """
+    Encoder une trame complète
+
+    Args:
+        msg_type: Type de message enregistré
+        fields: dict des champs du message
+        flags: Drapeaux (16 bits)
+
+    Returns:
+        bytes: En-tête + contenu
+    """
+    payload = REGISTRY[msg_type].encode(fields or {})
+    return HEADER.pack(PROTOCOL_VERSION, msg_type, flags, HEADER.size + len(payload)) + payload
+
+
+def decode_header(header, max_frame_size=MAX_FRAME_SIZE, max_sizes=None):
+    """
+    Décoder et valider un en-tête
+
+    Args:
+        header: Octets de l'en-tête
+        max_frame_size: Taille maximale par défaut
+        max_sizes: dict {type: taille maximale} (prioritaire sur max_frame_size)
+
+    Returns:
+        tuple: (type, drapeaux, taille du contenu)
+    """
+    version, msg_type, flags, total = HEADER.unpack(header)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Version de protocole non supportée: {version}")
+    if total < HEADER.size:
+        raise ProtocolError(f"Longueur de trame invalide: {total}")
+    limit = max_sizes.get(msg_type, max_frame_size) if max_sizes else max_frame_size
+    if total > limit:
+        raise FrameTooLarge(f"Trame trop grande: {total} octets (max {limit})")
+    return msg_type, flags, total - HEADER.size
+
+
+def decode_payload(msg_type, payload):
+    """
+    Décoder le contenu d'une trame
+
+    Returns:
+        dict: Champs du message, ou None si le type est inconnu
+    """
+    codec = REGISTRY.get(msg_type)
+    if codec is None:
+        return None
+    try:
+        return codec.decode(payload)
+    except (ValueError, struct.error, KeyError, TypeError) as e:
+        raise MalformedMessage(f"Message {codec.name} invalide: {e}")
+
+
+def read_frame(recv_exact, max_frame_size=MAX_FRAME_SIZE, max_sizes=None):
+    """
+    Lire une trame complète
+
+    Les types inconnus sont consommés en une seule lecture et renvoyés
+    avec fields=None: le flux reste synchronisé.
+
+    Args:
+        recv_exact: fonction(n) -> exactement n octets
+        max_frame_size: Taille maximale acceptée (vérifiée avant allocation)
+        max_sizes: dict {type: taille maximale} (voir decode_header)
+
+    Returns:
+        tuple: (type, drapeaux, champs ou None)
+    """
+    msg_type, flags, payload_size = decode_header(recv_exact(HEADER.size), max_frame_size, max_sizes)
+    payload = recv_exact(payload_size) if payload_size else b''
+    return msg_type, flags, decode_payload(msg_type, payload)
+
+
+def socket_reader(sock):
+    """Créer une fonction recv_exact pour un socket"""
+    def recv_exact(size):
+        data = bytearray(size)
+        view = memoryview(data)
+        received = 0
+        while received < size:
+            n = sock.recv_into(view[received:], size - received)
+            if not n:
+                raise ConnectionError("Connexion fermée")
+            received += n
+        return data
+    return recv_exact
+
+
+def buffer_reader(data):
+    """Créer une fonction recv_exact sur des bytes (tests, fuzzing)"""
+    view = memoryview(data)
+    position = [0]
+
+    def recv_exact(size):
+        start = position[0]
+        if start + size > len(view):
+            raise ConnectionError("Fin du flux")
+        position[0] = start + size
+        return view[start:start + size]
+    return recv_exact
+
+
+# --- Fuzzing et benchmark ---
+
+def _sample_frames():
+    return [
+        encode_frame(AUDIO, {'username': 'Alice', 'audio': b'RIFF' + bytes(32000)}),
+        encode_frame(TEXT, {'username': 'Éloïse', 'message': "Le déploiement est prévu demain"}),
+        encode_frame(USER_LIST, {'users': ['Alice', 'Bob', '🤖 Assistant']}),
+        encode_frame(SEARCH_REQUEST, {'query': 'deploiement'}),
+        encode_frame(SEARCH_RESULTS, {'results': [{'username': 'Alice', 'text': 'ok', 'score': 1.0}]}),
+        encode_frame(JOIN_ROOM, {'room': 'dev'}),
+        encode_frame(AI_TOGGLE, {'enabled': True}),
+        encode_frame(HELLO, {'username': 'Bob', 'capabilities': {'rate': 16000}}),
+    ]
+
+
+def fuzz_protocol(iterations=20000, seed=0):
+    """
+    Vérifier que le décodage ne lève que ProtocolError/ConnectionError
+    sur des trames mutées, tronquées ou aléatoires
+    """
+    import random
+
+    rng = random.Random(seed)
+    samples = _sample_frames()
+    unexpected = 0
+
+    for i in range(iterations):
+        frame = bytearray(rng.choice(samples))
+        mode = i % 4
+        if mode == 0:
+            # Octets aléatoires modifiés (contenu seulement: en-tête conservé)
+            for _ in range(rng.randint(1, 8)):
+                position = rng.randrange(HEADER.size, len(frame)) if len(frame) > HEADER.size else 0
+                frame[position] = rng.randrange(256)
+        elif mode == 1:
+            # Trame tronquée
+            frame = frame[:rng.randrange(len(frame))]
+        elif mode == 2:
+            # En-tête aléatoire
+            frame[:HEADER.size] = bytes(rng.randrange(256) for _ in range(HEADER.size))
+        else:
+            # Type inconnu suivi d'une trame valide: la seconde doit être lue correctement
+            unknown = HEADER.pack(PROTOCOL_VERSION, 200, 0, HEADER.size + 5) + b'xxxxx'
+            reader = buffer_reader(unknown + bytes(frame))
+            first = read_frame(reader)
+            second = read_frame(reader)
+            if first[2] is not None or second[2] is None:
+                unexpected += 1
+            continue
+
+        try:
+            read_frame(buffer_reader(bytes(frame)))
+        except (ProtocolError, ConnectionError):
+            pass
+        except Exception as e:
+            unexpected += 1
+            print(f"❌ Exception inattendue ({type(e).__name__}): {e}")
+
+    print(f"🧪 Fuzzing: {iterations} trames, {unexpected} erreurs inattendues")
+    return unexpected
+
+
+def benchmark_protocol(iterations=200000, byte_budget=64 * 1024 * 1024):
+    """
+    Mesurer le débit d'encodage/décodage par type de message
+
+    Args:
+        iterations: Trames par type de message au plus
+        byte_budget: Taille max du flux décodé par type (réduit les itérations des grosses trames)
+    """
+    print("🧪 BENCHMARK PROTOCOLE")
+    print("=" * 60)
+
+    cases = [
+        ('audio 32 Ko', AUDIO, {'username': 'Alice', 'audio': bytes(32000)}),
+        ('texte', TEXT, {'username': 'Alice', 'message': 'Bonjour tout le monde'}),
+        ('liste', USER_LIST, {'users': [f"user{i}" for i in range(20)]}),
+    ]
+    for label, msg_type, fields in cases:
+        count = max(1, min(iterations, byte_budget // len(encode_frame(msg_type, fields))))
+
+        start = time.perf_counter()
+        for _ in range(count):
+            frame = encode_frame(msg_type, fields)
+        encode_time = time.perf_counter() - start
+
+        stream = frame * count
+        reader = buffer_reader(stream)
+        start = time.perf_counter()
+        for _ in range(count):
+            read_frame(reader)
+        decode_time = time.perf_counter() - start
+
+        print(f"📦 {label}: encodage {count / encode_time:,.0f} trames/s, "
+              f"décodage {count / decode_time:,.0f} trames/s "
+              f"({len(stream) / decode_time / 1e6:,.0f} Mo/s, {count} trames)")
+
+
+if __name__ == "__main__":
+    fuzz_protocol()
+    benchmark_protocol()
@@ -0,0 +1,174 @@
+import threading
+import time
+
+import protocol
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, now=None):
+        """
+        Seau à jetons: débit moyen `rate` avec des pointes jusqu'à `burst`
+
+        Args:
+            rate: Jetons ajoutés par seconde (messages/s ou octets/s)
+            burst: Capacité du seau
+        """
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic() if now is None else now
+
+    def refill(self, now):
+        """Ajouter les jetons accumulés depuis la dernière mise à jour"""
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def is_full(self, now):
+        self.refill(now)
+        return self.tokens >= self.burst
+
+
+class ServerLimits:
+    def __init__(self, max_connections=256, handshake_timeout=10.0,
+                 max_pending_rejections=16, rejection_timeout=2.0,
+                 max_pending_send_bytes=8 * 1024 * 1024,
+                 max_frame_size=2 * 1024 * 1024, max_control_frame_size=64 * 1024,
+                 user_messages_per_sec=20, user_message_burst=40,
+                 user_bytes_per_sec=256 * 1024, user_byte_burst=2 * 1024 * 1024,
+                 room_messages_per_sec=100, room_message_burst=200,
+                 room_bytes_per_sec=1024 * 1024, room_byte_burst=8 * 1024 * 1024):
+        """
+        Limites d'admission et de débit du serveur
+
+        Les rafales en octets doivent contenir au moins une trame audio
+        maximale, sinon un clip autorisé ne passerait jamais.
+
+        Args:
+            max_connections: Connexions simultanées (poignées de main comprises)
+            handshake_timeout: Délai max (s) pour TLS + HELLO
+            max_pending_rejections: Refus "server_full" en cours simultanément;
+                au-delà, la connexion est fermée dès l'acceptation (sans thread)
+            rejection_timeout: Délai max (s) pour TLS + HELLO d'une connexion refusée
+            max_pending_send_bytes: Octets en attente d'envoi vers un client au-delà
+                desquels il est déconnecté (client qui ne lit plus)
+            max_frame_size: Taille max d'une trame AUDIO (vérifiée avant allocation)
+            max_control_frame_size: Taille max des autres trames
+            user_*: Seaux par session (connexion TCP et son plan UDP); pas par nom
+                d'utilisateur, choisi librement dans le HELLO
+            room_*: Seaux par salon pour le trafic diffusé (audio et texte)
+        """
+        self.max_connections = max_connections
+        self.handshake_timeout = handshake_timeout
+        self.max_pending_rejections = max_pending_rejections
+        self.rejection_timeout = rejection_timeout
+        self.max_pending_send_bytes = max(max_pending_send_bytes, max_frame_size)
+        self.max_frame_size = max_frame_size
+        self.max_control_frame_size = max_control_frame_size
+        self.user_messages_per_sec = user_messages_per_sec
+        self.user_message_burst = user_message_burst
+        self.user_bytes_per_sec = user_bytes_per_sec
+        self.user_byte_burst = max(user_byte_burst, max_frame_size)
+        self.room_messages_per_sec = room_messages_per_sec
+        self.room_message_burst = room_message_burst
+        self.room_bytes_per_sec = room_bytes_per_sec
+        self.room_byte_burst = max(room_byte_burst, max_frame_size)
+
+    def frame_size_limits(self):
+        """Tailles max par type de message, pour protocol.read_frame"""
+        limits = {msg_type: self.max_control_frame_size for msg_type in protocol.REGISTRY}
+        limits[protocol.AUDIO] = self.max_frame_size
+        return limits
+
+
+class RateLimiter:
+    def __init__(self, limits=None):
+        """
+        Seaux par utilisateur et par salon, et compteurs de trafic refusé
+
+        Args:
+            limits: ServerLimits (valeurs par défaut si None)
+        """
+        self.limits = limits or ServerLimits()
+        self.sessions = {}  # {session: (seau messages, seau octets)}
+        self.rooms = {}  # {salon: (seau messages, seau octets)}
+        self.lock = threading.Lock()
+
+        self.counters = {
+            'throttled_messages': 0,    # Messages jetés (débit utilisateur ou salon)
+            'throttled_bytes': 0,
+            'oversized_frames': 0,      # Trames au-delà de la taille max (connexion fermée)
+            'rejected_connections': 0,  # Serveur plein (refus explicite)
+            'dropped_connections': 0,   # Serveur plein et trop de refus en cours (fermées)
+            'handshake_timeouts': 0,
+            'invalid_audio': 0,         # Clips au WAV invalide (débit hors bornes...) jetés
+            'slow_consumers': 0,        # Clients déconnectés: file d'envoi pleine
+        }
+
+    def _buckets(self, table, key, msg_rate, msg_burst, byte_rate, byte_burst, now):
+        buckets = table.get(key)
+        if buckets is None:
+            buckets = (TokenBucket(msg_rate, msg_burst, now), TokenBucket(byte_rate, byte_burst, now))
+            table[key] = buckets
+        return buckets
+
+    def allow(self, session, size, room=None, messages=1, now=None):
+        """
+        Vérifier un message entrant contre les seaux de la session
+        (et du salon s'il est diffusé)
+
+        Args:
+            session: Session émettrice (socket du client): un nom réutilisé
+                     ne consomme pas le débit d'un autre utilisateur
+            size: Taille du message (octets)
+            room: Salon de diffusion, ou None pour une requête privée
+            messages: Messages comptés (0 pour les fragments UDP suivants d'un clip)
+
+        Returns:
+            bool: True si le message peut être traité
+        """
+        now = time.monotonic() if now is None else now
+        limits = self.limits
+        with self.lock:
+            checks = [self._buckets(self.sessions, session,
+                                    limits.user_messages_per_sec, limits.user_message_burst,
+                                    limits.user_bytes_per_sec, limits.user_byte_burst, now)]
+            if room is not None:
+                checks.append(self._buckets(self.rooms, room,
+                                            limits.room_messages_per_sec, limits.room_message_burst,
+                                            limits.room_bytes_per_sec, limits.room_byte_burst, now))
+
+            # Tout ou rien: un refus du salon ne coûte rien à l'utilisateur
+            for message_bucket, byte_bucket in checks:
+                message_bucket.refill(now)
+                byte_bucket.refill(now)
+                if message_bucket.tokens < messages or byte_bucket.tokens < size:
+                    self.counters['throttled_messages'] += 1
+                    self.counters['throttled_bytes'] += size
+                    return False
+            for message_bucket, byte_bucket in checks:
+                message_bucket.tokens -= messages
+                byte_bucket.tokens -= size
+            return True
+
+    def forget(self, session):
+        """Oublier les seaux d'une session terminée"""
+        with self.lock:
+            self.sessions.pop(session, None)
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def prune(self, now=None):
+        """Oublier les seaux pleins (inactifs): équivalents à des seaux neufs"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            for table in (self.sessions, self.rooms):
+                for key in [k for k, (m, d) in table.items() if m.is_full(now) and d.is_full(now)]:
+                    del table[key]
+
+    def report(self):
+        with self.lock:
+            return dict(self.counters)
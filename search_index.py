@@ -0,0 +1,720 @@
+import os
+import re
+import json
+import math
+import mmap
+import heapq
+import queue
+import bisect
+import struct
+import threading
+import time
+import unicodedata
+from array import array
+from datetime import datetime
+
+# Articles et pronoms élidés ("l'équipe", "qu'il", "d'accord")
+ELISION_RE = re.compile(r"\b(?:[cdjlmnst]|qu)['’]")
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Ligatures non décomposées par NFD
+LIGATURES = str.maketrans({'œ': 'oe', 'æ': 'ae', 'ß': 'ss'})
+
+SEGMENT_MAGIC = b'VSEG'
+# 2: blocs de postings (fin, dernier doc, tf max, longueur min, impact max, longueur moyenne)
+# 3: salon de chaque document
+SEGMENT_VERSION = 3
+SEGMENT_HEADER = struct.Struct('!4sBQ')  # magic, version, taille de l'en-tête JSON
+
+# Documents par bloc de postings: unité de décodage et d'élagage du top-k
+POSTING_BLOCK = 128
+
+# Paramètres BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def normalize_text(text):
+    """
+    Normaliser un texte pour l'indexation (français)
+
+    Même minusculisation que LocalAI.get_ai_response, puis suppression
+    des élisions, des accents et de la ponctuation.
+
+    Args:
+        text: Texte brut
+
+    Returns:
+        list: Liste des termes normalisés
+    """
+    if not text:
+        return []
+
+    text = text.lower().strip().translate(LIGATURES)
+    text = ELISION_RE.sub(' ', text)
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return TOKEN_RE.findall(text)
+
+
+def _append_varint(buf, value):
+    """Ajouter un entier en varint (7 bits par octet) à un bytearray"""
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _impact(tf, length, avg_length):
+    """Contribution BM25 d'un terme hors idf"""
+    return tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+
+
+def _decode_block(buf, pos, end, doc_id):
+    """
+    Décoder un bloc de postings compressé (chemin rapide: varints d'un octet)
+
+    Format: suite de couples (delta doc_id, tf) encodés en varint.
+
+    Args:
+        buf: Postings encodés
+        pos, end: Octets du bloc
+        doc_id: Dernier doc_id précédant le bloc (base des deltas)
+
+    Returns:
+        tuple: ([doc_id, ...], [tf, ...])
+    """
+    doc_ids = []
+    tfs = []
+    while pos < end:
+        byte = buf[pos]
+        pos += 1
+        if byte < 0x80:
+            doc_id += byte
+        else:
+            value = byte & 0x7F
+            shift = 7
+            while True:
+                byte = buf[pos]
+                pos += 1
+                value |= (byte & 0x7F) << shift
+                if byte < 0x80:
+                    break
+                shift += 7
+            doc_id += value
+        doc_ids.append(doc_id)
+
+        byte = buf[pos]
+        pos += 1
+        if byte < 0x80:
+            tfs.append(byte)
+        else:
+            value = byte & 0x7F
+            shift = 7
+            while True:
+                byte = buf[pos]
+                pos += 1
+                value |= (byte & 0x7F) << shift
+                if byte < 0x80:
+                    break
+                shift += 7
+            tfs.append(value)
+    return doc_ids, tfs
+
+
+class _MemorySegment:
+    """Segment en mémoire recevant les nouveaux documents"""
+
+    def __init__(self, base_doc):
+        self.base_doc = base_doc
+        self.postings = {}  # {terme: [bytearray, dernier doc_id, df, blocs]}
+        self.doc_lengths = array('I')
+        self.doc_rooms = array('I')  # Indice du salon de chaque document
+        self.room_ids = {}  # {salon: indice}
+        self.docs = []
+        self.total_length = 0
+
+    @property
+    def doc_count(self):
+        return len(self.docs)
+
+    def add(self, doc_id, terms, record, avg_length):
+        frequencies = {}
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+
+        length = len(terms)
+        for term, tf in frequencies.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = [bytearray(), 0, 0, []]
+                self.postings[term] = entry
+            _append_varint(entry[0], doc_id - entry[1])
+            _append_varint(entry[0], tf)
+            entry[1] = doc_id
+            entry[2] += 1
+
+            # Bloc courant: [fin, dernier doc, tf max, longueur min, impact max,
+            # longueur moyenne min, nombre]. L'impact dépend de la longueur moyenne
+            # au moment de l'ajout: la borne est corrigée à la recherche (voir _rank)
+            blocks = entry[3]
+            if not blocks or blocks[-1][6] >= POSTING_BLOCK:
+                blocks.append([0, 0, 0, length, 0.0, avg_length, 0])
+            block = blocks[-1]
+            block[0] = len(entry[0])
+            block[1] = doc_id
+            block[2] = max(block[2], tf)
+            block[3] = min(block[3], length)
+            block[4] = max(block[4], _impact(tf, length, avg_length))
+            block[5] = min(block[5], avg_length)
+            block[6] += 1
+
+        self.doc_lengths.append(len(terms))
+        self.doc_rooms.append(self.room_ids.setdefault(record['room'], len(self.room_ids)))
+        self.docs.append(record)
+        self.total_length += len(terms)
+
+    def term_postings(self, term):
+        """
+        Postings d'un terme (copiés: le segment continue de grossir)
+
+        Returns:
+            tuple: (postings, df, [(fin, dernier doc, tf max, longueur min, impact max,
+                                    longueur moyenne), ...])
+        """
+        entry = self.postings.get(term)
+        if entry is None:
+            return None, 0, None
+        return bytes(entry[0]), entry[2], [tuple(block[:6]) for block in entry[3]]
+
+    def doc_length(self, doc_id):
+        return self.doc_lengths[doc_id - self.base_doc]
+
+    def doc(self, doc_id):
+        return self.docs[doc_id - self.base_doc]
+
+    def write(self, path):
+        """Écrire le segment sur disque (fichier temporaire puis renommage)"""
+        postings_blob = bytearray()
+        blocks = array('d')
+        terms = {}
+        for term in sorted(self.postings):
+            data, _, df, term_blocks = self.postings[term]
+            terms[term] = [len(postings_blob), len(data), df, len(blocks) // 6, len(term_blocks)]
+            for block in term_blocks:
+                blocks.extend(block[:6])
+            postings_blob += data
+
+        docs_blob = bytearray()
+        doc_offsets = array('Q')
+        for record in self.docs:
+            doc_offsets.append(len(docs_blob))
+            docs_blob += json.dumps(record, ensure_ascii=False).encode('utf-8')
+        doc_offsets.append(len(docs_blob))
+
+        lengths_bytes = self.doc_lengths.tobytes()
+        offsets_bytes = doc_offsets.tobytes()
+        blocks_bytes = blocks.tobytes()
+        rooms_bytes = self.doc_rooms.tobytes()
+
+        header = json.dumps({
+            'base_doc': self.base_doc,
+            'doc_count': self.doc_count,
+            'total_length': self.total_length,
+            'terms': terms,
+            'lengths_size': len(lengths_bytes),
+            'offsets_size': len(offsets_bytes),
+            'blocks_size': len(blocks_bytes),
+            'rooms': sorted(self.room_ids, key=self.room_ids.get),
+            'rooms_size': len(rooms_bytes),
+            'postings_size': len(postings_blob),
+        }, ensure_ascii=False).encode('utf-8')
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, len(header)))
+            f.write(header)
+            f.write(lengths_bytes)
+            f.write(offsets_bytes)
+            f.write(blocks_bytes)
+            f.write(rooms_bytes)
+            f.write(postings_blob)
+            f.write(docs_blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+class _DiskSegment:
+    """Segment immuable sur disque, lu via mmap"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_size = SEGMENT_HEADER.unpack_from(self._mmap, 0)
+        if magic != SEGMENT_MAGIC or version not in (1, 2, SEGMENT_VERSION):
+            raise ValueError(f"Segment invalide: {path}")
+
+        offset = SEGMENT_HEADER.size
+        header = json.loads(self._mmap[offset:offset + header_size].decode('utf-8'))
+        offset += header_size
+
+        self.base_doc = header['base_doc']
+        self.doc_count = header['doc_count']
+        self.total_length = header['total_length']
+        self.terms = header['terms']
+
+        self.doc_lengths = array('I')
+        self.doc_lengths.frombytes(self._mmap[offset:offset + header['lengths_size']])
+        offset += header['lengths_size']
+
+        self.doc_offsets = array('Q')
+        self.doc_offsets.frombytes(self._mmap[offset:offset + header['offsets_size']])
+        offset += header['offsets_size']
+
+        # Version 1: pas de blocs (un seul bloc sans borne utile par terme)
+        self.blocks = array('d')
+        self.blocks.frombytes(self._mmap[offset:offset + header.get('blocks_size', 0)])
+        offset += header.get('blocks_size', 0)
+
+        # Avant la version 3: salon inconnu, documents exclus des recherches par salon
+        self.doc_rooms = array('I')
+        self.doc_rooms.frombytes(self._mmap[offset:offset + header.get('rooms_size', 0)])
+        offset += header.get('rooms_size', 0)
+        self.room_ids = {room: i for i, room in enumerate(header.get('rooms', []))}
+
+        self._postings_start = offset
+        self._docs_start = offset + header['postings_size']
+
+    def term_postings(self, term):
+        entry = self.terms.get(term)
+        if entry is None:
+            return None, 0, None
+        start = self._postings_start + entry[0]
+        if len(entry) > 3:
+            first = entry[3] * 6
+            flat = self.blocks[first:first + entry[4] * 6]
+            blocks = [(int(flat[i]), int(flat[i + 1]), int(flat[i + 2]), int(flat[i + 3]),
+                       flat[i + 4], flat[i + 5]) for i in range(0, len(flat), 6)]
+        else:
+            # Borne universelle: l'impact BM25 est toujours < k1 + 1
+            blocks = [(entry[1], self.base_doc + self.doc_count - 1, 0xFFFFFFFF, 0,
+                       BM25_K1 + 1, math.inf)]
+        return self._mmap[start:start + entry[1]], entry[2], blocks
+
+    def doc_length(self, doc_id):
+        return self.doc_lengths[doc_id - self.base_doc]
+
+    def doc(self, doc_id):
+        i = doc_id - self.base_doc
+        start = self._docs_start + self.doc_offsets[i]
+        end = self._docs_start + self.doc_offsets[i + 1]
+        return json.loads(self._mmap[start:end].decode('utf-8'))
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+class _Block:
+    """Bloc de postings d'un terme et sa borne de score"""
+    __slots__ = ('term', 'source', 'data', 'start', 'end', 'base', 'first', 'last', 'bound',
+                 'room_id', 'decoded')
+
+    def __init__(self, term, source, data, start, end, base, first, last, bound, room_id):
+        self.term = term
+        self.source = source
+        self.data = data
+        self.start = start
+        self.end = end
+        self.base = base      # Base des deltas (dernier doc du bloc précédent)
+        self.first = first    # Plus petit doc_id possible dans le bloc
+        self.last = last
+        self.bound = bound    # Score maximal d'un document pour ce terme dans ce bloc
+        self.room_id = room_id  # Salon gardé (indice dans la source), None: tous
+        self.decoded = None   # (doc_ids, contributions) une fois décodé
+
+
+def _rank(term_postings, total_docs, avg_length, limit, room=None):
+    """
+    Top-k BM25 avec élagage par bloc
+
+    Les doc_id sont découpés en intervalles disjoints aux frontières des
+    blocs; la borne d'un intervalle est la somme des bornes des blocs qui
+    le couvrent. Les intervalles sont traités par borne décroissante et
+    la recherche s'arrête quand aucun ne peut dépasser le k-ième score.
+    Les petits blocs (termes rares) sont décodés en premier: un bloc sans
+    document dans l'intervalle en est retiré avant de décoder les gros.
+
+    Args:
+        term_postings: {terme: ([(source, postings, blocs), ...], df)}
+        room: Ne garder que les documents de ce salon (None: tous)
+
+    Returns:
+        list: [(doc_id, score, source), ...] par score décroissant
+    """
+    norm = BM25_K1 * (1 - BM25_B)
+    slope = BM25_K1 * BM25_B / avg_length
+
+    term_blocks = []  # Par terme: blocs dans l'ordre des doc_id
+    for term, (parts, df) in enumerate(term_postings.values()):
+        idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+        blocks = []
+        for source, data, source_blocks in parts:
+            room_id = None
+            if room is not None:
+                room_id = source.room_ids.get(room)
+                if room_id is None:
+                    continue  # Aucun document de ce salon dans la source
+            start = 0
+            base = 0
+            first = source.base_doc
+            for end, last, max_tf, min_length, max_impact, block_avg in source_blocks:
+                # Deux bornes valides, on garde la plus serrée:
+                # - tf max et longueur min du bloc (éventuellement de documents différents)
+                # - impact max à l'indexation, corrigé si la moyenne a augmenté depuis
+                bound = idf * min(_impact(max_tf, min_length, avg_length),
+                                  max_impact * max(1.0, avg_length / block_avg))
+                blocks.append(_Block(term, source, data, start, end, base, first, last, bound, room_id))
+                start = end
+                base = last
+                first = last + 1
+        term_blocks.append((idf, blocks))
+
+    def decode(block, idf):
+        if block.decoded is None:
+            source = block.source
+            lengths = source.doc_lengths
+            offset = source.base_doc
+            doc_ids, tfs = _decode_block(block.data, block.start, block.end, block.base)
+            if block.room_id is not None:
+                rooms = source.doc_rooms
+                kept = [i for i, doc_id in enumerate(doc_ids) if rooms[doc_id - offset] == block.room_id]
+                doc_ids = [doc_ids[i] for i in kept]
+                tfs = [tfs[i] for i in kept]
+            scale = idf * (BM25_K1 + 1)
+            contributions = [scale * tf / (tf + norm + slope * lengths[doc_id - offset])
+                             for doc_id, tf in zip(doc_ids, tfs)]
+            block.decoded = (doc_ids, contributions)
+        return block.decoded
+
+    # Intervalles [début, fin] et blocs qui les couvrent
+    cuts = sorted({doc for _, blocks in term_blocks for b in blocks for doc in (b.first, b.last + 1)})
+    positions = [0] * len(term_blocks)
+    intervals = []
+    for low, next_cut in zip(cuts, cuts[1:]):
+        covering = []
+        bound = 0.0
+        for t, (idf, blocks) in enumerate(term_blocks):
+            i = positions[t]
+            while i < len(blocks) and blocks[i].last < low:
+                i += 1
+            positions[t] = i
+            if i < len(blocks) and blocks[i].first <= low:
+                covering.append((blocks[i], idf))
+                bound += blocks[i].bound
+        if covering:
+            covering.sort(key=lambda c: c[0].end - c[0].start)
+            intervals.append((-bound, low, next_cut - 1, covering))
+    heapq.heapify(intervals)
+
+    top = []  # Tas min des (score, doc_id, source), scores exacts
+    while intervals:
+        bound, low, high, covering = heapq.heappop(intervals)
+        bound = -bound
+        if len(top) >= limit and bound <= top[0][0]:
+            break
+
+        # Retirer les blocs sans document dans l'intervalle; si la borne baisse,
+        # réinsérer l'intervalle avant de décoder un bloc de plus
+        kept = []
+        deferred = False
+        for index, (block, idf) in enumerate(covering):
+            if block.decoded is None and len(kept) < index:
+                rest = kept + covering[index:]
+                heapq.heappush(intervals, (-sum(b.bound for b, _ in rest), low, high, rest))
+                deferred = True
+                break
+            doc_ids, _ = decode(block, idf)
+            if bisect.bisect_left(doc_ids, low) < bisect.bisect_right(doc_ids, high):
+                kept.append((block, idf))
+        if deferred or not kept:
+            continue
+
+        # Tous les blocs couvrant l'intervalle sont décodés: scores exacts
+        scores = {}
+        owners = {}
+        for block, idf in kept:
+            doc_ids, contributions = decode(block, idf)
+            i = bisect.bisect_left(doc_ids, low)
+            j = bisect.bisect_right(doc_ids, high)
+            for k in range(i, j):
+                doc_id = doc_ids[k]
+                scores[doc_id] = scores.get(doc_id, 0.0) + contributions[k]
+                owners[doc_id] = block.source
+
+        for doc_id, score in scores.items():
+            if len(top) < limit:
+                heapq.heappush(top, (score, doc_id, owners[doc_id]))
+            elif score > top[0][0]:
+                heapq.heapreplace(top, (score, doc_id, owners[doc_id]))
+
+    return [(doc_id, score, source) for score, doc_id, source in sorted(top, key=lambda e: (-e[0], e[1]))]
+
+
+class SearchIndex:
+    def __init__(self, index_dir="index", flush_threshold=100000):
+        """
+        Index inversé incrémental des messages texte et transcriptions
+
+        Args:
+            index_dir: Dossier des segments sur disque
+            flush_threshold: Nombre de documents en mémoire avant écriture d'un segment
+        """
+        self.index_dir = index_dir
+        self.flush_threshold = flush_threshold
+        self.lock = threading.Lock()
+        self.segments = []
+        self.frozen = []  # Segments mémoire pleins, cherchables jusqu'à leur écriture
+
+        os.makedirs(index_dir, exist_ok=True)
+        for name in sorted(os.listdir(index_dir)):
+            if name.startswith('segment_') and name.endswith('.seg'):
+                try:
+                    self.segments.append(_DiskSegment(os.path.join(index_dir, name)))
+                except Exception as e:
+                    print(f"⚠️  Segment ignoré {name}: {e}")
+
+        # Totaux des segments sur disque ou figés (longueur moyenne à l'indexation)
+        self.segment_docs = sum(s.doc_count for s in self.segments)
+        self.segment_length = sum(s.total_length for s in self.segments)
+
+        next_doc = 0
+        if self.segments:
+            last = self.segments[-1]
+            next_doc = last.base_doc + last.doc_count
+        self.memory = _MemorySegment(next_doc)
+
+        # Écriture des segments (+ fsync) hors du verrou, dans l'ordre de création
+        self.write_queue = queue.Queue()
+        self.writer = threading.Thread(target=self._write_segments)
+        self.writer.daemon = True
+        self.writer.start()
+
+    @property
+    def doc_count(self):
+        with self.lock:
+            return sum(s.doc_count for s in self.segments + self.frozen) + self.memory.doc_count
+
+    def add_document(self, text, username, kind='text', timestamp=None, room=None):
+        """
+        Indexer un message texte ou une transcription
+
+        Args:
+            text: Contenu du message
+            username: Auteur du message
+            kind: 'text' ou 'transcript'
+            timestamp: Horodatage (par défaut: maintenant)
+            room: Salon du message (la recherche est limitée au salon du demandeur)
+
+        Returns:
+            int: Identifiant du document
+        """
+        terms = normalize_text(text)
+        # L'auteur est aussi cherchable ("alice deploy")
+        terms.extend(normalize_text(username))
+
+        record = {
+            'username': username,
+            'text': text,
+            'kind': kind,
+            'room': room,
+            'timestamp': timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+        with self.lock:
+            doc_id = self.memory.base_doc + self.memory.doc_count
+            avg_length = ((self.segment_length + self.memory.total_length + len(terms))
+                          / (self.segment_docs + self.memory.doc_count + 1))
+            self.memory.add(doc_id, terms, record, max(avg_length, 1.0))
+            if self.memory.doc_count >= self.flush_threshold:
+                self._freeze_locked()
+
+        return doc_id
+
+    def flush(self):
+        """Écrire le segment mémoire sur disque (attend la fin de l'écriture)"""
+        with self.lock:
+            self._freeze_locked()
+        self.write_queue.join()
+
+    def _freeze_locked(self):
+        # Sous le verrou: seulement l'échange du segment mémoire, l'écriture est différée
+        if self.memory.doc_count == 0:
+            return
+
+        segment = self.memory
+        self.frozen.append(segment)
+        self.segment_docs += segment.doc_count
+        self.segment_length += segment.total_length
+        self.memory = _MemorySegment(segment.base_doc + segment.doc_count)
+        self.write_queue.put(segment)
+
+    def _write_segments(self):
+        """Thread d'écriture: segment figé -> fichier -> segment sur disque"""
+        while True:
+            segment = self.write_queue.get()
+            try:
+                if segment is None:
+                    return
+                path = os.path.join(self.index_dir, f"segment_{segment.base_doc:012d}.seg")
+                segment.write(path)
+                disk_segment = _DiskSegment(path)
+                with self.lock:
+                    self.segments.append(disk_segment)
+                    self.frozen.remove(segment)
+            except Exception as e:
+                # Le segment reste cherchable en mémoire
+                print(f"❌ Erreur écriture segment: {e}")
+            finally:
+                self.write_queue.task_done()
+
+    def search(self, query, limit=10, room=None):
+        """
+        Recherche classée (BM25) sur tous les segments
+
+        Args:
+            query: Requête libre ("alice deploy")
+            limit: Nombre maximum de résultats
+            room: Salon du demandeur (None: tous les salons)
+
+        Returns:
+            list: [{'score', 'username', 'text', 'kind', 'room', 'timestamp'}, ...]
+        """
+        terms = set(normalize_text(query))
+        if not terms:
+            return []
+
+        # Sous le verrou: seulement la copie des postings (add_document reste fluide)
+        with self.lock:
+            sources = self.segments + self.frozen + [self.memory]
+
+            total_docs = sum(s.doc_count for s in sources)
+            if total_docs == 0:
+                return []
+            avg_length = sum(s.total_length for s in sources) / total_docs
+
+            # Récupérer les postings (et df global) de chaque terme
+            term_postings = {}
+            for term in terms:
+                parts = []
+                df = 0
+                for source in sources:
+                    data, source_df, blocks = source.term_postings(term)
+                    if data is not None:
+                        parts.append((source, data, blocks))
+                        df += source_df
+                if df:
+                    term_postings[term] = (parts, df)
+
+        if not term_postings:
+            return []
+
+        results = []
+        for doc_id, score, source in _rank(term_postings, total_docs, avg_length, limit, room):
+            record = dict(source.doc(doc_id))
+            record['score'] = round(score, 4)
+            results.append(record)
+
+        return results
+
+    def close(self):
+        """Écrire les documents en attente et libérer les segments"""
+        self.flush()
+        self.write_queue.put(None)
+        self.writer.join()
+        with self.lock:
+            for segment in self.segments:
+                segment.close()
+            self.segments = []
+
+
+# Fonction utilitaire pour mesurer l'index
+def benchmark_index(n_docs=1000000, n_queries=1000, index_dir=None):
+    """
+    Mesurer le débit d'indexation et la latence p99 des requêtes
+
+    Les termes des requêtes suivent leur fréquence dans les documents
+    (auteurs compris): les termes courants, les plus coûteux, dominent.
+    """
+    import random
+    import shutil
+    import tempfile
+
+    print("🧪 BENCHMARK DE L'INDEX DE RECHERCHE")
+    print("=" * 60)
+
+    rng = random.Random(42)
+    vocabulary = [
+        "déploiement", "serveur", "réunion", "équipe", "problème", "réseau",
+        "mise", "à", "jour", "demain", "aujourd'hui", "l'application", "données",
+        "sauvegarde", "client", "audio", "micro", "qualité", "latence", "été",
+        "bonjour", "merci", "projet", "version", "test", "erreur", "corrigé",
+    ] + [f"mot{i}" for i in range(20000)]
+    users = ["Alice", "Bob", "Chloé", "David", "Éloïse"]
+
+    tmp_dir = index_dir or tempfile.mkdtemp(prefix='vocal_index_')
+    index = SearchIndex(tmp_dir)
+
+    # Échantillon (réservoir) des mots indexés, pour tirer les requêtes
+    sample = []
+    sample_size = 100000
+    seen = 0
+
+    try:
+        start = time.perf_counter()
+        for i in range(n_docs):
+            words = [rng.choice(vocabulary[:27]) if rng.random() < 0.5 else rng.choice(vocabulary)
+                     for _ in range(rng.randint(4, 20))]
+            username = rng.choice(users)
+            index.add_document(' '.join(words), username)
+
+            for word in words + [username]:
+                seen += 1
+                if len(sample) < sample_size:
+                    sample.append(word)
+                elif rng.randrange(seen) < sample_size:
+                    sample[rng.randrange(sample_size)] = word
+        index.flush()
+        elapsed = time.perf_counter() - start
+        print(f"📥 {n_docs} documents indexés en {elapsed:.1f}s "
+              f"({n_docs / elapsed:,.0f} docs/s, {len(index.segments)} segments)")
+
+        latencies = []
+        for _ in range(n_queries):
+            query = ' '.join(rng.choice(sample) for _ in range(rng.randint(1, 3)))
+            t0 = time.perf_counter()
+            index.search(query)
+            latencies.append(time.perf_counter() - t0)
+
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+        print(f"🔎 {n_queries} requêtes: p50 {p50:.1f} ms, p99 {p99:.1f} ms, "
+              f"max {latencies[-1] * 1000:.1f} ms")
+
+        # Pires cas: termes présents dans une grande partie des documents
+        for query in ("serveur", "alice", "serveur réseau équipe"):
+            t0 = time.perf_counter()
+            index.search(query)
+            print(f"   \"{query}\": {(time.perf_counter() - t0) * 1000:.1f} ms")
+    finally:
+        index.close()
+        if index_dir is None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    benchmark_index()
@@ -1,28 +1,149 @@
 import socket
 import threading
-import struct
 import time
+import os
+from collections import deque
 from datetime import datetime
+from search_index import SearchIndex
+from rate_limit import RateLimiter, ServerLimits
+from audio_io import check_wav
+import protocol
+
+DEFAULT_ROOM = 'general'
+DEFAULT_RATE_HZ = 16000
+
+# Débits acceptés dans la capacité 'rate' du HELLO (la conversion a un coût
+# proportionnel au débit: une valeur arbitraire bloquerait le relais)
+SUPPORTED_RATES = (8000, 16000, 22050, 44100, 48000)
+
+# Délai (s) laissé au writer pour vider la file d'un client qui se déconnecte
+OUTBOX_DRAIN_TIMEOUT = 1.0
+
+
+class ClientOutbox:
+    def __init__(self, client_socket, max_bytes):
+        """
+        File d'envoi bornée d'un client, vidée par son propre thread
+
+        Les broadcasts ne font qu'ajouter une trame (jamais de sendall bloquant
+        sous clients_lock): un client qui ne lit plus ne ralentit que lui-même.
+
+        Args:
+            client_socket: Socket du client
+            max_bytes: Octets en attente au-delà desquels le client est trop lent
+        """
+        self.socket = client_socket
+        self.max_bytes = max_bytes
+        self.frames = deque()
+        self.size = 0
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+
+    def put(self, frame):
+        """
+        Ajouter une trame sans bloquer
+
+        Returns:
+            bool: False si la file est pleine (client trop lent)
+        """
+        with self.condition:
+            if self.closed:
+                return True  # Déconnexion en cours: trame ignorée
+            if self.frames and self.size + len(frame) > self.max_bytes:
+                return False
+            self.frames.append(frame)
+            self.size += len(frame)
+            self.condition.notify()
+            return True
+
+    def run(self):
+        """Thread d'envoi: écrit les trames dans l'ordre, hors de tout verrou partagé"""
+        while True:
+            with self.condition:
+                while not self.frames and not self.closed:
+                    self.condition.wait()
+                if not self.frames:
+                    return
+                frame = self.frames.popleft()
+                self.size -= len(frame)
+            try:
+                self.socket.sendall(frame)
+            except Exception:
+                with self.condition:
+                    self.closed = True
+                    self.frames.clear()
+                return
+
+    def close(self, timeout=OUTBOX_DRAIN_TIMEOUT):
+        """Envoyer les trames restantes puis arrêter le thread (attente bornée)"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
 
 class VocalChatServer:
-    def __init__(self, host='0.0.0.0', port=5555):
+    def __init__(self, host='0.0.0.0', port=5555, index_dir='index', ai_model_path=None,
+                 normalize_rate=None, ssl_context=None, udp_port=None, limits=None):
         self.host = host
         self.port = port
+        self.ssl_context = ssl_context  # TLS optionnel (voir tls.server_context)
+        self.udp_port = udp_port  # Plan média UDP optionnel (None: tout en TCP)
+        self.media_relay = None
         self.server_socket = None
-        self.clients = {}  # {socket: {'username': str, 'address': tuple}}
+        self.clients = {}  # {socket: {'username': str, 'address': tuple, 'room': str}}
         self.clients_lock = threading.Lock()
         self.running = False
         
+        # Admission et limites de débit (voir rate_limit.ServerLimits)
+        self.limits = limits or ServerLimits()
+        self.rate_limiter = RateLimiter(self.limits)
+        self.frame_size_limits = self.limits.frame_size_limits()
+        self.connection_slots = threading.BoundedSemaphore(self.limits.max_connections)
+        self.rejection_slots = threading.BoundedSemaphore(self.limits.max_pending_rejections)
+        
+        # Index de recherche des messages texte et transcriptions
+        self.search_index = SearchIndex(index_dir)
+        
+        # Conversion audio: débit commun imposé aux audios reçus (None: aucun)
+        # puis débit annoncé par chaque destinataire dans son HELLO
+        self.normalize_rate = normalize_rate
+        try:
+            from audio_normalize import normalize_wav
+        except ImportError:  # numpy absent: relais tel quel
+            normalize_wav = None
+        self.normalize_wav = normalize_wav
+        
+        # Assistant IA (utilisateur virtuel, activé par salon)
+        self.assistant = None
+        if ai_model_path:
+            from ai_module import LocalAI
+            from ai_participant import AIParticipant
+            self.assistant = AIParticipant(self, LocalAI(vosk_model_path=ai_model_path))
+        
     def start(self):
         """Démarrer le serveur"""
         try:
             self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(5)
+            self.server_socket.listen(128)
             self.running = True
             
-            print(f"🎙️  Serveur de chat vocal démarré sur {self.host}:{self.port}")
+            # Les datagrammes (audio et jeton de session) ne sont pas chiffrés:
+            # pas de plan UDP quand TLS protège la connexion
+            if self.udp_port is not None and self.ssl_context:
+                print("⚠️  Plan média UDP désactivé: TLS actif et l'UDP n'est pas chiffré")
+            elif self.udp_port is not None:
+                from media_udp import UDPMediaRelay
+                self.media_relay = UDPMediaRelay(self, self.host, self.udp_port)
+                print(f"📡 Plan média UDP sur le port {self.media_relay.port}")
+            
+            print(f"🎙️  Serveur de chat vocal démarré sur {self.host}:{self.port}"
+                  f"{' (TLS)' if self.ssl_context else ''}")
             print(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
             print("-" * 60)
             
@@ -47,10 +168,19 @@ class VocalChatServer:
                 client_socket, address = self.server_socket.accept()
                 print(f"🔌 Nouvelle connexion de {address}")
                 
+                # Place réservée dès l'acceptation: les poignées de main en cours comptent
+                admitted = self.connection_slots.acquire(blocking=False)
+                
+                # Serveur plein: refus explicites en nombre limité, sinon fermeture immédiate
+                if not admitted and not self.rejection_slots.acquire(blocking=False):
+                    self.rate_limiter.count('dropped_connections')
+                    client_socket.close()
+                    continue
+                
                 # Thread pour gérer ce client
                 client_thread = threading.Thread(
                     target=self.handle_client,
-                    args=(client_socket, address)
+                    args=(client_socket, address, admitted)
                 )
                 client_thread.daemon = True
                 client_thread.start()
@@ -59,161 +189,386 @@ class VocalChatServer:
                 if self.running:
                     print(f"❌ Erreur acceptation connexion: {e}")
     
-    def handle_client(self, client_socket, address):
-        """Gérer un client spécifique"""
+    def handle_client(self, client_socket, address, admitted=True):
+        """Gérer un client spécifique (admitted: place obtenue sous la limite de connexions)"""
         username = None
+        registered = False
         
         try:
-            # Recevoir le nom d'utilisateur
-            username_length = struct.unpack('!I', client_socket.recv(4))[0]
-            username = client_socket.recv(username_length).decode('utf-8')
+            # Poignée de main TLS + HELLO en temps limité (connexions lentes ou muettes)
+            client_socket.settimeout(self.limits.handshake_timeout if admitted
+                                     else self.limits.rejection_timeout)
+            
+            # Poignée de main TLS dans le thread du client (n'immobilise pas accept)
+            if self.ssl_context:
+                client_socket = self.ssl_context.wrap_socket(client_socket, server_side=True)
+            
+            # Octets lus, pour les limites de débit en octets
+            received = [0]
+            socket_recv = protocol.socket_reader(client_socket)
+            
+            def recv_exact(size):
+                received[0] += size
+                return socket_recv(size)
             
-            # Ajouter le client à la liste
+            # Poignée de main: HELLO (nom + capacités) -> WELCOME
+            msg_type, _, hello = protocol.read_frame(recv_exact, max_sizes=self.frame_size_limits)
+            
+            if not admitted:
+                # Refus explicite en réponse au HELLO (pas de reset avant lecture)
+                self.rate_limiter.count('rejected_connections')
+                print(f"⛔ Serveur plein: connexion de {address} refusée")
+                client_socket.sendall(protocol.encode_frame(protocol.ERROR, {
+                    'code': 'server_full', 'message': "Serveur plein, réessayez plus tard"}))
+                return
+            
+            if msg_type != protocol.HELLO or not hello or not hello.get('username'):
+                client_socket.sendall(protocol.encode_frame(protocol.ERROR, {
+                    'code': 'handshake', 'message': "HELLO attendu"}))
+                return
+            
+            username = str(hello['username'])
+            capabilities = hello.get('capabilities')
+            capabilities = dict(capabilities) if isinstance(capabilities, dict) else {}
+            rate = capabilities.get('rate')
+            if rate is not None and (type(rate) is not int or rate not in SUPPORTED_RATES):
+                print(f"⚠️  Débit ignoré pour {username}: {rate!r}")
+                del capabilities['rate']
+            
+            # Plan média UDP: port + jeton de session si le client le demande
+            welcome_capabilities = self.server_capabilities()
+            if self.media_relay and not self.ssl_context and capabilities.get('udp'):
+                welcome_capabilities['udp'] = {
+                    'port': self.media_relay.port,
+                    'token': self.media_relay.register(client_socket).hex()}
+            
+            # Envois par la file du client: le WELCOME y précède tout broadcast
+            client_socket.settimeout(None)
+            outbox = ClientOutbox(client_socket, self.limits.max_pending_send_bytes)
+            outbox.put(protocol.encode_frame(protocol.WELCOME, {
+                'server': 'VocalChatServer',
+                'capabilities': welcome_capabilities}))
+            outbox.thread.start()
+            
+            # Ajouter le client sous le verrou: l'enregistrement UDP le trouve
             with self.clients_lock:
                 self.clients[client_socket] = {
                     'username': username,
-                    'address': address
+                    'address': address,
+                    'room': DEFAULT_ROOM,
+                    'capabilities': capabilities,
+                    'outbox': outbox
                 }
+                registered = True
             
             print(f"✅ {username} connecté depuis {address}")
             self.broadcast_user_list()
             
             # Boucle de réception des messages
+            last_notice = 0.0
             while self.running:
-                # Recevoir le type de message (1 byte)
-                msg_type = client_socket.recv(1)
-                if not msg_type:
-                    break
+                received[0] = 0
+                try:
+                    msg_type, flags, fields = protocol.read_frame(
+                        recv_exact, max_sizes=self.frame_size_limits)
+                except protocol.MalformedMessage as e:
+                    # Trame consommée entièrement: le flux reste synchronisé
+                    print(f"⚠️  Message invalide de {username}: {e}")
+                    continue
                 
-                msg_type = struct.unpack('B', msg_type)[0]
+                if fields is None:
+                    # Type inconnu (client plus récent): déjà ignoré
+                    continue
                 
-                if msg_type == 1:  # Message audio
-                    self.handle_audio_message(client_socket, username)
-                elif msg_type == 2:  # Message texte
-                    self.handle_text_message(client_socket, username)
+                # Débit par utilisateur, et par salon pour le trafic diffusé
+                room = self.get_room(client_socket) if msg_type in (protocol.AUDIO, protocol.TEXT) else None
+                if not self.rate_limiter.allow(client_socket, received[0], room):
+                    # Message jeté; avertir au plus une fois par seconde
+                    now = time.monotonic()
+                    if now - last_notice >= 1.0:
+                        last_notice = now
+                        print(f"🚦 {username} limité ({protocol.REGISTRY[msg_type].name})")
+                        self.send_frame(client_socket, protocol.encode_frame(protocol.ERROR, {
+                            'code': 'rate_limited', 'message': "Débit trop élevé, messages ignorés"}))
+                    continue
                 
+                if msg_type == protocol.AUDIO:
+                    self.handle_audio_message(client_socket, username, fields['audio'])
+                elif msg_type == protocol.TEXT:
+                    self.handle_text_message(client_socket, username, fields['message'])
+                elif msg_type == protocol.SEARCH_REQUEST:
+                    self.handle_search_message(client_socket, username, fields['query'])
+                elif msg_type == protocol.JOIN_ROOM:
+                    self.handle_join_room(client_socket, username, fields['room'])
+                elif msg_type == protocol.AI_TOGGLE:
+                    self.handle_ai_toggle(client_socket, username, fields['enabled'])
+                
+        except protocol.FrameTooLarge as e:
+            # Contenu non lu: le flux est désynchronisé, la connexion est fermée
+            self.rate_limiter.count('oversized_frames')
+            print(f"⛔ {username or address}: {e}")
+            self.send_frame(client_socket, protocol.encode_frame(protocol.ERROR, {
+                'code': 'frame_too_large', 'message': str(e)}))
+        except socket.timeout:
+            if not registered:
+                self.rate_limiter.count('handshake_timeouts')
+            print(f"⏱️  Délai dépassé pour {username or address}")
+        except ConnectionError:
+            pass
         except Exception as e:
             print(f"⚠️  Erreur avec {username or address}: {e}")
         finally:
             # Nettoyer la déconnexion
+            if self.media_relay:
+                self.media_relay.unregister(client_socket)
+            
             with self.clients_lock:
-                if client_socket in self.clients:
-                    user_info = self.clients[client_socket]
-                    del self.clients[client_socket]
-                    print(f"👋 {user_info['username']} déconnecté")
+                user_info = self.clients.pop(client_socket, None)
+            if user_info:
+                print(f"👋 {user_info['username']} déconnecté")
+                user_info['outbox'].close()
+            self.rate_limiter.forget(client_socket)
             
+            try:
+                client_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             try:
                 client_socket.close()
             except:
                 pass
             
-            self.broadcast_user_list()
+            if admitted:
+                self.connection_slots.release()
+            else:
+                self.rejection_slots.release()
+            
+            if registered:
+                self.rate_limiter.prune()
+                self.broadcast_user_list()
     
-    def handle_audio_message(self, sender_socket, username):
+    def server_capabilities(self):
+        """Capacités annoncées dans le WELCOME"""
+        features = ['search', 'rooms']
+        if self.assistant:
+            features.append('ai')
+        return {
+            'version': protocol.PROTOCOL_VERSION,
+            'features': features,
+            'rate': self.normalize_rate or DEFAULT_RATE_HZ,
+            'max_frame_size': self.limits.max_frame_size,
+            'message_types': sorted(protocol.REGISTRY),
+        }
+    
+    def limits_report(self):
+        """Compteurs du trafic limité ou refusé (TCP et UDP)"""
+        report = self.rate_limiter.report()
+        if self.media_relay:
+            report['udp_rejected_datagrams'] = self.media_relay.rejected
+            report['udp_throttled_datagrams'] = self.media_relay.throttled
+        return report
+    
+    def handle_audio_message(self, sender_socket, username, audio_data):
         """Gérer la réception et broadcast d'un message audio"""
         try:
-            # Recevoir la taille du chunk audio
-            audio_size = struct.unpack('!I', sender_socket.recv(4))[0]
-            
-            # Recevoir les données audio
-            audio_data = b''
-            remaining = audio_size
-            while remaining > 0:
-                chunk = sender_socket.recv(min(remaining, 4096))
-                if not chunk:
-                    break
-                audio_data += chunk
-                remaining -= len(chunk)
-            
-            if len(audio_data) == audio_size:
-                print(f"🎵 Audio reçu de {username} ({audio_size} bytes)")
-                
-                # Broadcaster aux autres clients
-                self.broadcast_audio(sender_socket, username, audio_data)
+            print(f"🎵 Audio reçu de {username} ({len(audio_data)} bytes)")
+            room = self.get_room(sender_socket)
+            
+            # En-tête WAV non fiable: clip jeté plutôt que converti
+            if not self.check_audio(username, audio_data):
+                return
+            
+            # Convertir au format commun si le client utilise un autre débit/nombre de canaux
+            if self.normalize_rate and self.normalize_wav:
+                audio_data = self.normalize_wav(audio_data, self.normalize_rate)
+            
+            # Broadcaster aux autres clients
+            self.broadcast_audio(sender_socket, username, audio_data, room)
+            
+            # Transcription/réponse IA hors du chemin de relais
+            if self.assistant:
+                self.assistant.submit(room, username, audio_data)
             
         except Exception as e:
             print(f"❌ Erreur traitement audio: {e}")
     
-    def handle_text_message(self, sender_socket, username):
+    def handle_text_message(self, sender_socket, username, message):
         """Gérer un message texte"""
         try:
-            # Recevoir la taille du message
-            msg_size = struct.unpack('!I', sender_socket.recv(4))[0]
-            
-            # Recevoir le message
-            message = sender_socket.recv(msg_size).decode('utf-8')
             print(f"💬 {username}: {message}")
+            room = self.get_room(sender_socket)
+            self.search_index.add_document(message, username, kind='text', room=room)
             
             # Broadcaster le message texte
-            self.broadcast_text(sender_socket, username, message)
+            self.broadcast_text(sender_socket, username, message, room)
             
         except Exception as e:
             print(f"❌ Erreur traitement message texte: {e}")
     
-    def broadcast_audio(self, sender_socket, username, audio_data):
-        """Envoyer l'audio à tous les clients sauf l'émetteur"""
-        username_bytes = username.encode('utf-8')
+    def handle_search_message(self, sender_socket, username, query):
+        """Exécuter une recherche et renvoyer les résultats au demandeur"""
+        try:
+            results = self.search_index.search(query, room=self.get_room(sender_socket))
+            print(f"🔎 {username} cherche \"{query}\" ({len(results)} résultats)")
+            
+            self.send_frame(sender_socket, protocol.encode_frame(
+                protocol.SEARCH_RESULTS, {'results': results}))
+            
+        except Exception as e:
+            print(f"❌ Erreur recherche: {e}")
+    
+    def handle_join_room(self, sender_socket, username, room):
+        """Changer le salon d'un client"""
+        try:
+            room = room.strip() or DEFAULT_ROOM
+            
+            with self.clients_lock:
+                if sender_socket in self.clients:
+                    self.clients[sender_socket]['room'] = room
+            
+            print(f"🚪 {username} rejoint #{room}")
+            self.broadcast_user_list()
+            
+        except Exception as e:
+            print(f"❌ Erreur changement de salon: {e}")
+    
+    def handle_ai_toggle(self, sender_socket, username, enabled):
+        """Activer ou désactiver l'assistant IA dans le salon de l'émetteur"""
+        try:
+            room = self.get_room(sender_socket)
+            
+            if not self.assistant:
+                self.send_text_to(sender_socket, "Serveur", "Assistant IA non disponible sur ce serveur")
+                return
+            
+            self.assistant.set_room_enabled(room, enabled)
+            state = "activé" if enabled else "désactivé"
+            print(f"🤖 Assistant {state} dans #{room} par {username}")
+            
+            self.broadcast_text(None, "Serveur", f"Assistant IA {state} par {username}", room)
+            self.broadcast_user_list()
+            
+        except Exception as e:
+            print(f"❌ Erreur activation assistant: {e}")
+    
+    def get_room(self, client_socket):
+        """Salon courant d'un client"""
+        with self.clients_lock:
+            info = self.clients.get(client_socket)
+            return info['room'] if info else DEFAULT_ROOM
+    
+    def send_frame(self, client_socket, frame):
+        """Envoyer une trame à un seul client (par sa file, dans l'ordre des broadcasts)"""
+        with self.clients_lock:
+            info = self.clients.get(client_socket)
+            if info:
+                self.deliver(client_socket, info, frame)
+                return
         
+        # Pas encore enregistré (poignée de main): envoi direct, délai de poignée de main
+        try:
+            client_socket.sendall(frame)
+        except Exception as e:
+            print(f"❌ Erreur envoi: {e}")
+    
+    def deliver(self, client_socket, info, frame):
+        """Placer une trame dans la file d'un client; déconnecter les clients trop lents"""
+        if info['outbox'].put(frame):
+            return
+        self.rate_limiter.count('slow_consumers')
+        print(f"🐢 {info['username']} ne lit plus assez vite: déconnecté")
+        info['outbox'].close(timeout=0)
+        try:
+            # Débloque la réception: handle_client nettoie la session
+            client_socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    
+    def send_text_to(self, client_socket, username, message):
+        """Envoyer un message texte à un seul client"""
+        self.send_frame(client_socket, protocol.encode_frame(
+            protocol.TEXT, {'username': username, 'message': message}))
+    
+    def check_audio(self, username, audio_data):
+        """Valider le WAV d'un clip reçu (TCP ou UDP) avant relais et conversion"""
+        try:
+            check_wav(audio_data)
+            return True
+        except ValueError as e:
+            self.rate_limiter.count('invalid_audio')
+            print(f"⛔ Audio de {username} jeté: {e}")
+            return False
+    
+    def audio_for_rate(self, audio_data, rate):
+        """
+        Adapter l'audio au débit annoncé par un destinataire (capacité 'rate')
+        
+        Args:
+            audio_data: WAV reçu
+            rate: Débit du destinataire (validé au HELLO), ou None
+        
+        Returns:
+            bytes: WAV converti, ou audio_data si aucune conversion n'est possible
+        """
+        if not rate or not self.normalize_wav:
+            return audio_data
+        return self.normalize_wav(audio_data, rate)
+    
+    def broadcast_audio(self, sender_socket, username, audio_data, room=DEFAULT_ROOM, skip_udp=False):
+        """Envoyer l'audio aux clients du salon sauf l'émetteur (skip_udp: déjà relayé en UDP)"""
         with self.clients_lock:
-            for client_socket in list(self.clients.keys()):
-                if client_socket != sender_socket:
-                    try:
-                        # Type: audio (1)
-                        client_socket.send(struct.pack('B', 1))
-                        # Taille du username
-                        client_socket.send(struct.pack('!I', len(username_bytes)))
-                        # Username
-                        client_socket.send(username_bytes)
-                        # Taille audio
-                        client_socket.send(struct.pack('!I', len(audio_data)))
-                        # Données audio
-                        client_socket.send(audio_data)
-                        
-                    except Exception as e:
-                        print(f"❌ Erreur envoi audio: {e}")
-    
-    def broadcast_text(self, sender_socket, username, message):
-        """Envoyer un message texte à tous les clients"""
-        username_bytes = username.encode('utf-8')
-        message_bytes = message.encode('utf-8')
+            recipients = [(client_socket, info['capabilities'].get('rate'))
+                          for client_socket, info in self.clients.items()
+                          if client_socket != sender_socket and info['room'] == room
+                          and not (skip_udp and info.get('udp_addr'))]
+        
+        # Conversions hors du verrou: une seule par débit distinct
+        frames = {}
+        for _, rate in recipients:
+            if rate not in frames:
+                try:
+                    converted = self.audio_for_rate(audio_data, rate)
+                except Exception as e:
+                    print(f"❌ Erreur conversion audio ({rate} Hz): {e}")
+                    converted = audio_data
+                frames[rate] = protocol.encode_frame(
+                    protocol.AUDIO, {'username': username, 'audio': converted})
+        
+        with self.clients_lock:
+            for client_socket, rate in recipients:
+                info = self.clients.get(client_socket)
+                if info is None:
+                    continue  # Déconnecté pendant la conversion
+                self.deliver(client_socket, info, frames[rate])
+    
+    def broadcast_text(self, sender_socket, username, message, room=DEFAULT_ROOM):
+        """Envoyer un message texte aux clients du salon"""
+        frame = protocol.encode_frame(protocol.TEXT, {'username': username, 'message': message})
         
         with self.clients_lock:
-            for client_socket in list(self.clients.keys()):
-                if client_socket != sender_socket:
-                    try:
-                        # Type: texte (2)
-                        client_socket.send(struct.pack('B', 2))
-                        # Taille username
-                        client_socket.send(struct.pack('!I', len(username_bytes)))
-                        # Username
-                        client_socket.send(username_bytes)
-                        # Taille message
-                        client_socket.send(struct.pack('!I', len(message_bytes)))
-                        # Message
-                        client_socket.send(message_bytes)
-                        
-                    except Exception as e:
-                        print(f"❌ Erreur envoi texte: {e}")
+            for client_socket, info in list(self.clients.items()):
+                if client_socket != sender_socket and info['room'] == room:
+                    self.deliver(client_socket, info, frame)
     
     def broadcast_user_list(self):
-        """Envoyer la liste des utilisateurs connectés à tous"""
+        """Envoyer à chaque client la liste des utilisateurs de son salon"""
         with self.clients_lock:
             usernames = [info['username'] for info in self.clients.values()]
-            users_str = ','.join(usernames)
-            users_bytes = users_str.encode('utf-8')
+            print(f"👥 Utilisateurs connectés: {','.join(usernames) if usernames else 'Aucun'}")
             
-            print(f"👥 Utilisateurs connectés: {users_str if users_str else 'Aucun'}")
+            rooms = {}
+            for info in self.clients.values():
+                rooms.setdefault(info['room'], []).append(info['username'])
             
-            for client_socket in list(self.clients.keys()):
-                try:
-                    # Type: liste utilisateurs (3)
-                    client_socket.send(struct.pack('B', 3))
-                    # Taille
-                    client_socket.send(struct.pack('!I', len(users_bytes)))
-                    # Liste
-                    client_socket.send(users_bytes)
-                except Exception as e:
-                    print(f"❌ Erreur envoi liste: {e}")
+            # L'assistant apparaît comme un utilisateur dans les salons où il est actif
+            if self.assistant:
+                for room, members in rooms.items():
+                    if self.assistant.is_enabled(room):
+                        members.append(self.assistant.username)
+            
+            for client_socket, info in list(self.clients.items()):
+                self.deliver(client_socket, info, protocol.encode_frame(
+                    protocol.USER_LIST, {'users': rooms[info['room']]}))
     
     def stop(self):
         """Arrêter le serveur proprement"""
@@ -222,13 +577,31 @@ class VocalChatServer:
         
         # Fermer toutes les connexions clients
         with self.clients_lock:
-            for client_socket in list(self.clients.keys()):
+            for client_socket, info in list(self.clients.items()):
+                info['outbox'].close(timeout=0)
                 try:
                     client_socket.close()
                 except:
                     pass
             self.clients.clear()
         
+        # Arrêter le plan média UDP
+        if self.media_relay:
+            self.media_relay.stop()
+        
+        # Arrêter l'assistant IA
+        if self.assistant:
+            self.assistant.stop()
+            print(f"⏱️  Latences assistant: {self.assistant.latency_report()}")
+        
+        print(f"🚦 Trafic limité/refusé: {self.limits_report()}")
+        
+        # Écrire les messages indexés sur disque
+        try:
+            self.search_index.close()
+        except Exception as e:
+            print(f"❌ Erreur fermeture index: {e}")
+        
         # Fermer le socket serveur
         if self.server_socket:
             try:
@@ -240,7 +613,22 @@ class VocalChatServer:
 
 
 if __name__ == "__main__":
-    server = VocalChatServer(host='0.0.0.0', port=5555)
+    # L'assistant IA est hébergé si un modèle Vosk est présent
+    ai_model_path = 'model' if os.path.isdir('model') else None
+    
+    # TLS si un certificat est présent (python tls.py / tls.generate_self_signed)
+    ssl_context = None
+    if os.path.exists('certs/cert.pem') and os.path.exists('certs/key.pem'):
+        import tls
+        ssl_context = tls.server_context('certs/cert.pem', 'certs/key.pem')
+    
+    # Limites d'admission et de débit (à ajuster selon la machine et le réseau)
+    limits = ServerLimits(max_connections=256)
+    
+    # UDP (audio en clair) seulement sans TLS
+    server = VocalChatServer(host='0.0.0.0', port=5555, ai_model_path=ai_model_path,
+                             ssl_context=ssl_context, udp_port=None if ssl_context else 5556,
+                             limits=limits)
     
     try:
         server.start()
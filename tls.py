@@ -0,0 +1,192 @@
+import os
+import ssl
+import socket
+import subprocess
+import threading
+import time
+
+# Suites AEAD accélérées matériellement (AES-NI) ou rapides en logiciel (ChaCha20)
+TLS12_CIPHERS = 'ECDHE+AESGCM:ECDHE+CHACHA20'
+
+
+def generate_self_signed(cert_dir="certs", hostname="localhost"):
+    """
+    Générer un certificat auto-signé local (hors ligne, via openssl)
+
+    Clé ECDSA P-256: poignées de main bien plus rapides qu'avec RSA.
+
+    Args:
+        cert_dir: Dossier de sortie
+        hostname: Nom du serveur (CN et subjectAltName)
+
+    Returns:
+        tuple: (chemin du certificat, chemin de la clé)
+    """
+    os.makedirs(cert_dir, exist_ok=True)
+    certfile = os.path.join(cert_dir, "cert.pem")
+    keyfile = os.path.join(cert_dir, "key.pem")
+
+    if os.path.exists(certfile) and os.path.exists(keyfile):
+        return certfile, keyfile
+
+    subprocess.run([
+        "openssl", "req", "-x509", "-newkey", "ec",
+        "-pkeyopt", "ec_paramgen_curve:prime256v1", "-nodes",
+        "-keyout", keyfile, "-out", certfile, "-days", "365",
+        "-subj", f"/CN={hostname}",
+        "-addext", f"subjectAltName=DNS:{hostname},DNS:localhost,IP:127.0.0.1",
+    ], check=True, capture_output=True)
+
+    print(f"🔐 Certificat auto-signé généré: {certfile}")
+    return certfile, keyfile
+
+
+def server_context(certfile, keyfile, num_tickets=2):
+    """
+    Contexte TLS serveur
+
+    Les tickets de session (TLS 1.3) sont chiffrés avec une clé propre au
+    contexte: il faut réutiliser le même contexte pour toutes les connexions.
+
+    Args:
+        certfile: Certificat PEM
+        keyfile: Clé privée PEM
+        num_tickets: Tickets de session envoyés après chaque poignée de main
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.set_ciphers(TLS12_CIPHERS)
+    context.load_cert_chain(certfile, keyfile)
+    context.num_tickets = num_tickets
+    return context
+
+
+def client_context(cafile=None, verify=True):
+    """
+    Contexte TLS client
+
+    Args:
+        cafile: Certificat de confiance (ex: le certificat auto-signé du serveur)
+        verify: Vérifier le certificat et le nom du serveur
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.set_ciphers(TLS12_CIPHERS)
+    if cafile:
+        context.load_verify_locations(cafile)
+    else:
+        context.load_default_certs()
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+# Fonction utilitaire pour mesurer le coût de TLS
+def benchmark_tls(handshakes=300, megabytes=64, frame_size=32000):
+    """Mesurer le débit de poignées de main (complètes/reprises) et le coût CPU par Mo relayé"""
+    import tempfile
+    import protocol
+
+    print("🧪 BENCHMARK TLS")
+    print("=" * 60)
+
+    certfile, keyfile = generate_self_signed(tempfile.mkdtemp(prefix='vocal_tls_'))
+    srv_ctx = server_context(certfile, keyfile)
+    cli_ctx = client_context(certfile)
+
+    # 1. Poignées de main
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(128)
+    port = listener.getsockname()[1]
+
+    def handshake_server():
+        while True:
+            try:
+                raw, _ = listener.accept()
+            except OSError:
+                return
+            try:
+                raw.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                conn = srv_ctx.wrap_socket(raw, server_side=True)
+                conn.sendall(b'\x00')  # Force l'envoi des tickets de session
+                conn.recv(1)
+                conn.close()
+            except (OSError, ssl.SSLError):
+                raw.close()
+
+    threading.Thread(target=handshake_server, daemon=True).start()
+
+    def run_handshakes(resume):
+        session = None
+        reused = 0
+        start = time.perf_counter()
+        for _ in range(handshakes):
+            raw = socket.create_connection(('127.0.0.1', port))
+            raw.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = cli_ctx.wrap_socket(raw, server_hostname='localhost',
+                                       session=session if resume else None)
+            conn.recv(1)
+            reused += conn.session_reused
+            session = conn.session
+            conn.sendall(b'\x00')
+            conn.close()
+        return handshakes / (time.perf_counter() - start), reused
+
+    full_rate, _ = run_handshakes(resume=False)
+    resumed_rate, reused = run_handshakes(resume=True)
+    listener.close()
+    print(f"🤝 Poignées de main complètes: {full_rate:,.0f}/s")
+    print(f"🎫 Poignées de main reprises:  {resumed_rate:,.0f}/s ({reused}/{handshakes} réutilisées)")
+
+    # 2. Coût CPU du relais audio (envoi + réception dans ce processus)
+    frame = protocol.encode_frame(protocol.AUDIO, {'username': 'Alice', 'audio': bytes(frame_size)})
+    count = megabytes * 1024 * 1024 // len(frame)
+
+    def relay_cost(use_tls):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        sender = socket.create_connection(listener.getsockname())
+        receiver, _ = listener.accept()
+        listener.close()
+
+        if use_tls:
+            result = {}
+            wrap = threading.Thread(target=lambda: result.update(
+                conn=srv_ctx.wrap_socket(receiver, server_side=True)))
+            wrap.start()
+            sender = cli_ctx.wrap_socket(sender, server_hostname='localhost')
+            wrap.join()
+            receiver = result['conn']
+
+        def drain():
+            recv_exact = protocol.socket_reader(receiver)
+            for _ in range(count):
+                protocol.read_frame(recv_exact)
+
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        reader = threading.Thread(target=drain)
+        reader.start()
+        for _ in range(count):
+            sender.sendall(frame)
+        reader.join()
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - start
+
+        sender.close()
+        receiver.close()
+        total_mb = count * len(frame) / (1024 * 1024)
+        return cpu / total_mb * 1000, total_mb / wall
+
+    plain_cpu, plain_rate = relay_cost(use_tls=False)
+    tls_cpu, tls_rate = relay_cost(use_tls=True)
+    print(f"📡 Relais en clair: {plain_cpu:.2f} ms CPU/Mo ({plain_rate:,.0f} Mo/s)")
+    print(f"🔒 Relais TLS:      {tls_cpu:.2f} ms CPU/Mo ({tls_rate:,.0f} Mo/s)")
+    print(f"➕ Surcoût TLS:     {tls_cpu - plain_cpu:.2f} ms CPU/Mo")
+
+
+if __name__ == "__main__":
+    benchmark_tls()
@@ -0,0 +1,124 @@
+from array import array
+
+from search_index import normalize_text
+
+
+class Word:
+    """Mot transcrit avec ses timings (secondes) et sa confiance"""
+
+    __slots__ = ('word', 'start', 'end', 'conf')
+
+    def __init__(self, word, start, end, conf):
+        self.word = word
+        self.start = start
+        self.end = end
+        self.conf = conf
+
+    def __repr__(self):
+        return f"Word({self.word!r}, {self.start:.2f}-{self.end:.2f}, conf={self.conf:.2f})"
+
+
+class Transcription:
+    """
+    Résultat structuré d'une transcription Vosk
+
+    Les timings sont stockés en colonnes (array 'f') plutôt qu'en liste
+    de dicts: quelques octets par mot, et les objets Word ne sont créés
+    qu'à l'itération.
+    """
+
+    __slots__ = ('words', 'starts', 'ends', 'confs', 'duration')
+
+    def __init__(self, duration=0.0):
+        self.words = []
+        self.starts = array('f')
+        self.ends = array('f')
+        self.confs = array('f')
+        self.duration = duration
+
+    def add_vosk_result(self, result):
+        """Ajouter les mots d'un résultat Vosk (SetWords(True)) déjà décodé en JSON"""
+        for item in result.get('result', ()):
+            self.words.append(item['word'])
+            self.starts.append(item['start'])
+            self.ends.append(item['end'])
+            self.confs.append(item.get('conf', 1.0))
+
+    @property
+    def text(self):
+        return ' '.join(self.words)
+
+    def __str__(self):
+        return self.text
+
+    def __len__(self):
+        return len(self.words)
+
+    def __bool__(self):
+        return bool(self.words)
+
+    def __iter__(self):
+        for i in range(len(self.words)):
+            yield Word(self.words[i], self.starts[i], self.ends[i], self.confs[i])
+
+    def __getitem__(self, i):
+        return Word(self.words[i], self.starts[i], self.ends[i], self.confs[i])
+
+    def segments(self, max_gap=0.6, max_words=12):
+        """
+        Découper en segments (sous-titres) sur les pauses
+
+        Args:
+            max_gap: Silence (s) au-delà duquel un nouveau segment commence
+            max_words: Nombre maximum de mots par segment
+
+        Returns:
+            list: [(début, fin, texte), ...]
+        """
+        segments = []
+        first = 0
+        for i in range(1, len(self.words) + 1):
+            if (i == len(self.words)
+                    or self.starts[i] - self.ends[i - 1] > max_gap
+                    or i - first >= max_words):
+                segments.append((round(self.starts[first], 3), round(self.ends[i - 1], 3),
+                                 ' '.join(self.words[first:i])))
+                first = i
+        return segments
+
+    def speech_bounds(self, padding=0.1):
+        """
+        Bornes de la parole, pour supprimer les silences de début et fin
+
+        Returns:
+            tuple: (début, fin) en secondes, ou None si aucun mot
+        """
+        if not self.words:
+            return None
+        start = max(0.0, self.starts[0] - padding)
+        end = self.ends[-1] + padding
+        if self.duration:
+            end = min(end, self.duration)
+        return round(start, 3), round(end, 3)
+
+    def highlight(self, query):
+        """
+        Mots correspondant à une requête (même normalisation que l'index)
+
+        Returns:
+            list: Indices des mots correspondants
+        """
+        terms = set(normalize_text(query))
+        return [i for i, word in enumerate(self.words)
+                if terms.intersection(normalize_text(word))]
+
+    def to_dict(self):
+        """Représentation JSON (format des mots de Vosk)"""
+        return {
+            'text': self.text,
+            'duration': round(self.duration, 3),
+            'words': [
+                {'word': w, 'start': round(s, 3), 'end': round(e, 3), 'conf': round(c, 3)}
+                for w, s, e, c in zip(self.words, self.starts, self.ends, self.confs)
+            ],
+        }